@@ -60,61 +60,115 @@ The score of the winning board can now be calculated. Start by finding the sum o
 To guarantee victory against the giant squid, figure out which board will win first. What will your final score be if you choose that board?
 
 """
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence
+import functools
+import os
 
+import pytest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to pure Python.
+    np = None
+
+
+Pattern = tuple[int, ...]
+
+
+def row_patterns(size: int = 5) -> list[Pattern]:
+    """Return the cell indices of each row of a board."""
+    return [tuple(range(size * i, (size * i) + size)) for i in range(size)]
+
+
+def column_patterns(size: int = 5) -> list[Pattern]:
+    """Return the cell indices of each column of a board."""
+    return [tuple(range(i, size * size, size)) for i in range(size)]
 
-class Board:
-    """Represent a Bingo board."""
 
-    def __init__(self, *numbers: int, size: int = 5):
+def diagonal_patterns(size: int = 5) -> list[Pattern]:
+    """Return the cell indices of both diagonals of a board."""
+    return [
+        tuple((size + 1) * i for i in range(size)),
+        tuple((size - 1) * (i + 1) for i in range(size)),
+    ]
+
+
+def corner_patterns(size: int = 5) -> list[Pattern]:
+    """Return the cell indices of the four corners of a board as a single pattern."""
+    return [(0, size - 1, size * (size - 1), (size * size) - 1)]
+
+
+def default_patterns(size: int = 5) -> list[Pattern]:
+    """Return the rows and columns of a board."""
+    return row_patterns(size) + column_patterns(size)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_patterns(cells: int, patterns: tuple[Pattern, ...]) -> tuple[Pattern, ...]:
+    """Return the indices of the patterns that each cell belongs to."""
+    cell_patterns: list[list[int]] = [[] for _ in range(cells)]
+    for pattern_idx, pattern in enumerate(patterns):
+        for cell in pattern:
+            if not 0 <= cell < cells:
+                raise ValueError(
+                    f"Pattern cells must be on the board. Got {cell=} for {cells=}."
+                )
+            cell_patterns[cell].append(pattern_idx)
+    return tuple(tuple(indices) for indices in cell_patterns)
+
+
+class Board:
+    """Represent a Bingo board.
+
+    A board wins when every cell of any of its patterns has been marked.
+    Each pattern keeps a count of its unmarked cells, so marking a number
+    only touches the patterns its cell belongs to.
+    """
+
+    def __init__(
+        self,
+        *numbers: int,
+        size: int = 5,
+        patterns: Optional[Iterable[Pattern]] = None,
+    ):
+        if patterns is None:
+            patterns = default_patterns(size)
+        patterns = tuple(tuple(pattern) for pattern in patterns)
         self._numbers = set(numbers)
-        self._draws: list[int] = []
-        self.rows = [set(numbers[size * i : (size * i) + size]) for i in range(size)]
-        self.columns = [
-            set(number for (idx, number) in enumerate(numbers) if idx % size == i)
-            for i in range(size)
-        ]
+        self._cells = {number: idx for (idx, number) in enumerate(numbers)}
+        self._cell_patterns = compile_patterns(len(numbers), patterns)
+        self._unmarked = [len(pattern) for pattern in patterns]
+        self._last_draw = 0
+        self.has_won = False
 
     def mark(self, draw: int) -> None:
         """Mark number drawn on board if present."""
-        self._draws.append(draw)
+        self._last_draw = draw
         if draw not in self._numbers:
             return
         self._numbers.remove(draw)
-        for row in self.rows:
-            if draw in row:
-                row.remove(draw)
-        for column in self.columns:
-            if draw in column:
-                column.remove(draw)
-
-    @property
-    def has_won(self) -> bool:
-        """Return True if this board has won."""
-        for row in self.rows:
-            if not row:
-                return True
-        for column in self.columns:
-            if not column:
-                return True
-        return False
+        for pattern_idx in self._cell_patterns[self._cells[draw]]:
+            self._unmarked[pattern_idx] -= 1
+            if not self._unmarked[pattern_idx]:
+                self.has_won = True
 
     @property
     def score(self) -> int:
         """Return the score of this board."""
         if not self.has_won:
             return 0
-        last_draw = self._draws[-1]
-        unmarked = self._numbers
-        sum_unmarked = sum(number for number in unmarked)
-        return last_draw * sum_unmarked
+        return self._last_draw * sum(self._numbers)
 
 
 def solve_part_one(draws: list[int], boards: list[Board]) -> int:
     """Return the score of the first board to win."""
-    for draw_count, draw in enumerate(draws):
+    for draw in draws:
         for board in boards:
             board.mark(draw)
-            if draw_count >= 4 and board.has_won:
+            if board.has_won:
                 return board.score
     raise Exception("Could not solve part one!")
 
@@ -264,24 +318,329 @@ def test_solve_part_two() -> None:
     assert actual == expected
 
 
+def parse_draws(line: str) -> list[int]:
+    """Return the draws from the first line of the puzzle input."""
+    return [int(draw) for draw in line.strip("\n").split(",")]
+
+
+def iter_boards(lines: Iterable[str]) -> Iterator[list[int]]:
+    """Yield the numbers on each board as the lines of the puzzle input are read.
+
+    The lines must not include the draws.
+    """
+    board_numbers: list[int] = []
+    for line in lines:
+        line = line.strip("\n")
+        if line:
+            board_numbers.extend(int(number) for number in line.split(" ") if number)
+        elif board_numbers:
+            yield board_numbers
+            board_numbers = []
+    if board_numbers:
+        yield board_numbers
+
+
+def parse_input(lines: Iterable[str]) -> tuple[list[int], list[list[int]]]:
+    """Return the draws and the numbers on each board from the lines of the puzzle input."""
+    lines = iter(lines)
+    draws = parse_draws(next(lines))
+    return draws, list(iter_boards(lines))
+
+
+TEST_INPUT = """7,4,9,5,11,17,23,2,0,14,21,24,10,16,13,6,15,25,12,22,18,20,8,19,3,26,1
+
+22 13 17 11  0
+ 8  2 23  4 24
+21  9 14 16  7
+ 6 10  3 18  5
+ 1 12 20 15 19
+
+ 3 15  0  2 22
+ 9 18 13 17  5
+19  8  7 25 23
+20 11 10 24  4
+14 21 16 12  6
+
+14 21 17 24  4
+10 16 15  9 19
+18  8 23 26 20
+22 11 13  6  5
+ 2  0 12  3  7""".split("\n")
+
+
+def test_parse_input() -> None:
+    draws, boards = parse_input(TEST_INPUT)
+    assert draws == TEST_DRAWS
+    assert len(boards) == 3
+    assert boards[0][:5] == [22, 13, 17, 11, 0]
+    assert boards[2][-5:] == [2, 0, 12, 3, 7]
+
+
+class Win(NamedTuple):
+    turn: int
+    score: int
+
+
+def rank_draws(draws: list[int]) -> dict[int, int]:
+    """Return a map of each drawn number to the turn on which it is first drawn."""
+    ranks: dict[int, int] = {}
+    for turn, draw in enumerate(draws):
+        ranks.setdefault(draw, turn)
+    return ranks
+
+
+def find_win(
+    numbers: list[int],
+    draws: list[int],
+    ranks: dict[int, int],
+    size: int = 5,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> Optional[Win]:
+    """Return the turn on which a board wins and its score, or None if it never wins.
+
+    A pattern is complete on the turn its last number is drawn, so the
+    board wins on the earliest of those turns.
+    """
+    never = len(draws)
+    turns = [ranks.get(number, never) for number in numbers]
+    if patterns is None:
+        row_turns = (max(turns[size * i : (size * i) + size]) for i in range(size))
+        column_turns = (max(turns[i::size]) for i in range(size))
+        turn = min(min(row_turns), min(column_turns))
+    else:
+        turn = min(max(turns[cell] for cell in pattern) for pattern in patterns)
+    if turn == never:
+        return None
+    unmarked = sum(number for (number, drawn) in zip(numbers, turns) if drawn > turn)
+    return Win(turn=turn, score=unmarked * draws[turn])
+
+
+def find_wins_vectorized(
+    draws: list[int],
+    boards: list[list[int]],
+    size: int = 5,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> list[Optional[Win]]:
+    """Return the win of each board, computed over all boards at once with NumPy."""
+    never = len(draws)
+    if not draws:
+        return [None] * len(boards)
+    numbers = np.array(boards, dtype=np.int64).reshape(-1, size, size)
+    drawn = np.array(draws, dtype=np.int64)
+    unique, first = np.unique(drawn, return_index=True)
+    # Map every number on every board to the turn it is drawn by looking
+    # it up among the sorted unique draws.
+    found = np.minimum(np.searchsorted(unique, numbers), len(unique) - 1)
+    turns = np.where(unique[found] == numbers, first[found], never)
+    if patterns is None:
+        row_turns = turns.max(axis=2).min(axis=1)
+        column_turns = turns.max(axis=1).min(axis=1)
+        win_turns = np.minimum(row_turns, column_turns)
+    else:
+        # Gather patterns of equal length together so each group
+        # reduces as a single (B, patterns, length) array.
+        flat_turns = turns.reshape(len(boards), size * size)
+        by_length: dict[int, list[Pattern]] = {}
+        for pattern in patterns:
+            by_length.setdefault(len(pattern), []).append(pattern)
+        win_turns = np.min(
+            [
+                flat_turns[:, np.array(group)].max(axis=2).min(axis=1)
+                for group in by_length.values()
+            ],
+            axis=0,
+        )
+    unmarked = np.where(turns > win_turns[:, None, None], numbers, 0).sum(axis=(1, 2))
+    scores = unmarked * np.append(drawn, 0)[win_turns]
+    return [
+        Win(turn=turn, score=score) if turn < never else None
+        for (turn, score) in zip(win_turns.tolist(), scores.tolist())
+    ]
+
+
+def find_wins(
+    draws: list[int],
+    boards: list[list[int]],
+    size: int = 5,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> list[Optional[Win]]:
+    """Return the win of each board, using NumPy if it is available."""
+    if not boards:
+        return []
+    if np is not None:
+        return find_wins_vectorized(draws, boards, size, patterns)
+    ranks = rank_draws(draws)
+    return [find_win(numbers, draws, ranks, size, patterns) for numbers in boards]
+
+
+Ranking = tuple[int, int, int]
+
+
+def rank_wins(
+    draws: list[int],
+    boards: list[list[int]],
+    size: int = 5,
+    offset: int = 0,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> Optional[tuple[Ranking, Ranking]]:
+    """Return the turn, index, and score of the first and last boards to win.
+
+    Boards are indexed from the offset. Boards that never win are ignored.
+    """
+    wins = [
+        (win.turn, offset + idx, win.score)
+        for (idx, win) in enumerate(find_wins(draws, boards, size, patterns))
+        if win is not None
+    ]
+    if not wins:
+        return None
+    return min(wins), max(wins)
+
+
+def solve_tournament(
+    draws: list[int],
+    boards: list[list[int]],
+    size: int = 5,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> tuple[int, int]:
+    """Return the scores of the first and the last boards to win.
+
+    Boards that never win are ignored.
+    """
+    ranked = rank_wins(draws, boards, size, patterns=patterns)
+    if ranked is None:
+        raise Exception("No board wins!")
+    first, last = ranked
+    return first[2], last[2]
+
+
+def solve_tournament_in_parallel(
+    lines: Iterable[str],
+    size: int = 5,
+    shard_size: int = 10_000,
+    workers: Optional[int] = None,
+    patterns: Optional[Sequence[Pattern]] = None,
+) -> tuple[int, int]:
+    """Return the scores of the first and the last boards to win.
+
+    Boards are streamed from the lines of the puzzle input in shards,
+    and each shard is ranked by a worker process. At most two shards
+    per worker are held in memory at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    lines = iter(lines)
+    draws = parse_draws(next(lines))
+    boards = iter_boards(lines)
+    results: list[Optional[tuple[Ranking, Ranking]]] = []
+    with ProcessPoolExecutor(workers) as executor:
+        pending: deque[Future[Optional[tuple[Ranking, Ranking]]]] = deque()
+        offset = 0
+        while shard := list(islice(boards, shard_size)):
+            pending.append(
+                executor.submit(rank_wins, draws, shard, size, offset, patterns)
+            )
+            offset += len(shard)
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+    ranked = [result for result in results if result is not None]
+    if not ranked:
+        raise Exception("No board wins!")
+    first = min(first for (first, _) in ranked)
+    last = max(last for (_, last) in ranked)
+    return first[2], last[2]
+
+
+def test_find_win() -> None:
+    draws, boards = parse_input(TEST_INPUT)
+    ranks = rank_draws(draws)
+    actual = [find_win(numbers, draws, ranks) for numbers in boards]
+    assert actual == [Win(13, 2192), Win(14, 1924), Win(11, 4512)]
+
+
+def test_find_wins_vectorized() -> None:
+    pytest.importorskip("numpy")
+    draws, boards = parse_input(TEST_INPUT)
+    ranks = rank_draws(draws)
+    expected = [find_win(numbers, draws, ranks) for numbers in boards]
+    assert find_wins_vectorized(draws, boards) == expected
+    assert find_wins_vectorized(draws[:5], boards) == [None, None, None]
+    assert find_wins_vectorized([], boards) == [None, None, None]
+    assert find_wins_vectorized([], boards) == find_wins([], boards)
+    # Negative and very large numbers must not index a dense table.
+    shifted = [[number * 10**6 - 7 for number in numbers] for numbers in boards]
+    shifted_draws = [draw * 10**6 - 7 for draw in draws]
+    ranks = rank_draws(shifted_draws)
+    expected = [find_win(numbers, shifted_draws, ranks) for numbers in shifted]
+    assert find_wins_vectorized(shifted_draws, shifted) == expected
+
+
+def test_solve_tournament() -> None:
+    draws, boards = parse_input(TEST_INPUT)
+    assert solve_tournament(draws, boards) == (4512, 1924)
+
+
+def test_board_patterns() -> None:
+    numbers = list(range(25))
+    diagonal = Board(*numbers, patterns=diagonal_patterns())
+    for draw in [0, 6, 12, 18]:
+        diagonal.mark(draw)
+    assert not diagonal.has_won
+    diagonal.mark(24)
+    assert diagonal.has_won
+    assert diagonal.score == 24 * (sum(numbers) - 60)
+    corners = Board(*numbers, patterns=corner_patterns())
+    for draw in [0, 4, 20, 24]:
+        corners.mark(draw)
+    assert corners.has_won
+    with pytest.raises(ValueError):
+        Board(*numbers, patterns=[(0, 25)])
+
+
+def test_solve_with_corner_patterns() -> None:
+    numbers = list(range(25))
+    draws = [0, 4, 20, 24, 7, 8]
+    corners = Board(*numbers, patterns=corner_patterns())
+    assert solve_part_one(draws, [corners]) == 6048
+    draws = [0, 4, 20, 24, 1, 5, 21, 25]
+    boards = [numbers, list(range(1, 26))]
+    expected = solve_tournament(draws, boards, patterns=corner_patterns())
+    actual = (
+        solve_part_one(draws, [Board(*b, patterns=corner_patterns()) for b in boards]),
+        solve_part_two(draws, [Board(*b, patterns=corner_patterns()) for b in boards]),
+    )
+    assert actual == expected == (6048, 5625)
+
+
+def test_find_win_patterns() -> None:
+    draws, boards = parse_input(TEST_INPUT)
+    patterns = default_patterns() + diagonal_patterns()
+    ranks = rank_draws(draws)
+    expected = [
+        find_win(numbers, draws, ranks, patterns=patterns) for numbers in boards
+    ]
+    assert expected[2] == Win(7, 494)
+    assert find_wins(draws, boards, patterns=patterns) == expected
+
+
+def test_iter_boards() -> None:
+    boards = iter_boards(TEST_INPUT[2:])
+    assert next(boards)[:5] == [22, 13, 17, 11, 0]
+    assert len(list(boards)) == 2
+
+
+def test_solve_tournament_in_parallel() -> None:
+    actual = solve_tournament_in_parallel(TEST_INPUT, shard_size=1, workers=2)
+    assert actual == (4512, 1924)
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
     input_file = Path("./input04.txt")
     with input_file.open() as f:
-        boards: list[Board] = []
-        board_numbers: list[int] = []
-        draws = []
-        for idx, line in enumerate(line.strip("\n") for line in f.readlines()):
-            if idx == 0:
-                draws = [int(draw) for draw in line.split(",")]
-            elif not line and idx > 1:
-                boards.append(Board(*board_numbers))
-                board_numbers = []
-            else:
-                board_numbers.extend(
-                    [int(number) for number in line.split(" ") if number]
-                )
+        draws, board_numbers = parse_input(f)
+    boards = [Board(*numbers) for numbers in board_numbers]
     print(
         "What is the final score of the board that will win first?",
         solve_part_one(draws, boards),
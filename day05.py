@@ -44,8 +44,26 @@ Consider only horizontal and vertical lines. At how many points do at least two
 
 """
 
-from collections import Counter
-from typing import NamedTuple
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Union
+from pathlib import Path
+import gzip
+import math
+import mmap
+import os
+import random
+import tempfile
+
+import pytest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to a bytearray.
+    np = None
 
 
 class Point(NamedTuple):
@@ -53,56 +71,63 @@ class Point(NamedTuple):
     y: int
 
 
-class Line(NamedTuple):
+@dataclass(frozen=True)
+class Line:
+    """Represent a horizontal, vertical, or 45 degree diagonal line of points.
+
+    The points run from start to stop in steps of step, so a line can be
+    traced from start, step, and count without building its points.
+    Derived properties are computed on first access.
+    """
+
     start: Point
     stop: Point
 
-    @property
+    @cached_property
     def is_horizontal(self) -> bool:
         """Return True if the line is horizontal."""
         return self.start.y == self.stop.y
 
-    @property
+    @cached_property
     def is_vertical(self) -> bool:
         """Return True if the line is vertical."""
         return self.start.x == self.stop.x
 
+    @cached_property
+    def step(self) -> Point:
+        """Return the change in x and y from one point of the line to the next."""
+        run = self.stop.x - self.start.x
+        rise = self.stop.y - self.start.y
+        if run and rise and abs(run) != abs(rise):
+            raise ValueError(
+                f"The diagonal Lines must be at a 45 degree angle. Got {rise=} and {run=}."
+            )
+        return Point(x=(run > 0) - (run < 0), y=(rise > 0) - (rise < 0))
+
+    @cached_property
+    def count(self) -> int:
+        """Return the number of points on the line."""
+        return max(abs(self.stop.x - self.start.x), abs(self.stop.y - self.start.y)) + 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Point]:
+        """Yield the points of the line from start to stop."""
+        x, y = self.start
+        dx, dy = self.step
+        for i in range(self.count):
+            yield Point(x=x + dx * i, y=y + dy * i)
+
     @property
     def points(self) -> list[Point]:
-        if self.is_horizontal:
-            min_x, max_x = sorted([self.start.x, self.stop.x])
-            y = self.start.y
-            return [Point(x=min_x + i, y=y) for i in range(max_x - min_x + 1)]
-        elif self.is_vertical:
-            min_y, max_y = sorted([self.start.y, self.stop.y])
-            x = self.start.x
-            return [Point(x=x, y=min_y + i) for i in range(max_y - min_y + 1)]
-        else:
-            # The line is diagonal at a 45 degree angle
-            # The slope should either be 1 or -1
-            rise = self.stop.y - self.start.y
-            run = self.stop.x - self.start.x
-            slope = rise / run
-            if slope not in [1, -1]:
-                raise ValueError(
-                    f"The diagonal Lines must be at a 45 degree angle. Got slope of {slope=}."
-                )
-            dx = 1
-            if self.stop.x < self.start.x:
-                dx = -1
-            dy = 1
-            if self.stop.y < self.start.y:
-                dy = -1
-            points = [
-                Point(x=self.start.x + (dx * i), y=self.start.y + (dy * i))
-                for i in range(abs(rise) + 1)
-            ]
-            return points
+        """Return the points of the line from start to stop."""
+        return list(self)
 
 
-def solve_part_one(raw_segments: list[str]) -> int:
-    """Return the number of intersection points of horizontal and vertical lines."""
-    lines = [
+def parse_segments(raw_segments: list[str]) -> list[Line]:
+    """Return the Lines described by the raw segments."""
+    return [
         Line(
             *(
                 Point(*(int(number) for number in point.split(",")))
@@ -111,13 +136,18 @@ def solve_part_one(raw_segments: list[str]) -> int:
         )
         for segment in raw_segments
     ]
+
+
+def solve_part_one(raw_segments: list[str]) -> int:
+    """Return the number of intersection points of horizontal and vertical lines."""
+    lines = parse_segments(raw_segments)
     horizontal_and_vertical = [
         line for line in lines if line.is_horizontal or line.is_vertical
     ]
-    plane: Counter[Point] = Counter()
+    plane = TiledPlane()
     for line in horizontal_and_vertical:
-        plane.update(line.points)
-    return sum(1 for point in plane if plane[point] >= 2)
+        plane.add(line)
+    return plane.count_overlaps()
 
 
 TEST_SEGMENTS = [
@@ -176,36 +206,68 @@ def test_diagonal_lines() -> None:
     assert actual == expected
 
 
+def test_line_steps() -> None:
+    line = Line(Point(9, 7), Point(7, 9))
+    assert (line.start, line.step, len(line)) == (Point(9, 7), Point(-1, 1), 3)
+    assert list(line) == [Point(9, 7), Point(8, 8), Point(7, 9)]
+    assert Line(Point(9, 4), Point(3, 4)).step == Point(-1, 0)
+    assert len(Line(Point(2, 2), Point(2, 2))) == 1
+    with pytest.raises(ValueError):
+        Line(Point(0, 0), Point(1, 2)).step
+
+
 def solve_part_two(raw_segments: list[str]) -> int:
     """Return the number of intersection points of horizontal, vertical, and diagonal lines."""
-    lines = [
-        Line(
-            *(
-                Point(*(int(number) for number in point.split(",")))
-                for point in segment.split(" -> ")
-            )
-        )
-        for segment in raw_segments
-    ]
-    plane: Counter[Point] = Counter()
+    lines = parse_segments(raw_segments)
+    plane = TiledPlane()
     for line in lines:
-        plane.update(line.points)
-    return sum(1 for point in plane if plane[point] >= 2)
+        plane.add(line)
+    return plane.count_overlaps()
+
 
+# Maps a count of lines to its marker: "." for none, "+" for ten or more.
+MARKERS = b"." + b"123456789" + b"+" * 246
 
-def pretty_print_intersections(plane: Counter[Point]) -> None:
+
+def pretty_print_intersections(plane: "TiledPlane") -> None:
     """Print a plane with intersection counts."""
-    max_x = max(point.x for point in plane.keys())
-    max_y = max(point.y for point in plane.keys())
-    for y in range(max_y + 1):
-        row: list[str] = []
-        for x in range(max_x + 1):
-            point = Point(x, y)
-            marker = "."
-            if point in plane:
-                marker = str(plane.get(point))
-            row.append(marker)
-        print("".join(row), end="\n")
+    if plane.right < plane.left:
+        return
+    for y in range(plane.bottom + 1):
+        row = plane.row(y, 0, plane.right)
+        print(row.translate(MARKERS).decode(), end="\n")
+
+
+def render_intersections(plane: "TiledPlane", path: Path, scale: int = 1) -> None:
+    """Write the intersection counts of the plane to a file, one row at a time.
+
+    A path ending in .pgm is written as a binary greyscale image. Other
+    paths are written as text like pretty_print_intersections(), and are
+    compressed if they end in .gz. Each pixel or marker is the highest
+    count in a scale by scale block of points. An empty plane is written
+    as an empty image or text.
+    """
+    width = height = right = 0
+    if plane.right >= plane.left:
+        width = -(-(plane.right - plane.left + 1) // scale)
+        height = -(-(plane.bottom - plane.top + 1) // scale)
+        right = plane.left + (width * scale) - 1
+    is_image = path.suffix == ".pgm"
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "wb") as f:
+        if is_image:
+            f.write(f"P5\n{width} {height}\n{max(plane.max_count(), 1)}\n".encode())
+        for block_y in range(height):
+            first_y = plane.top + (block_y * scale)
+            if scale == 1:
+                block = plane.row(first_y, plane.left, right)
+            else:
+                block = bytes(width)
+                for y in range(first_y, first_y + scale):
+                    row = plane.row(y, plane.left, right)
+                    blocks = (row[i::scale] for i in range(scale))
+                    block = bytes(map(max, block, *blocks))
+            f.write(block if is_image else block.translate(MARKERS) + b"\n")
 
 
 def test_solve_part_two() -> None:
@@ -214,6 +276,534 @@ def test_solve_part_two() -> None:
     assert actual == expected
 
 
+# Maps a count of lines to that count plus one, saturating at 255.
+SATURATING_INCREMENT = bytes(min(count + 1, 255) for count in range(256))
+
+Cells = Union[bytearray, "np.ndarray"]
+
+
+class Raster(NamedTuple):
+    """Represent the count of lines covering each point of a rectangle of the plane.
+
+    The counts are stored row by row in a flat array of bytes, starting
+    from the point at (left, top).
+    """
+
+    cells: Cells
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+def increment_run(cells: Cells, start: int, step: int, count: int) -> None:
+    """Increment the counts of cells spaced step apart from start."""
+    if count == 1:
+        step = 1
+    elif step < 0:
+        start, step = start + step * (count - 1), -step
+    run = slice(start, start + step * (count - 1) + 1, step)
+    if isinstance(cells, bytearray):
+        cells[run] = cells[run].translate(SATURATING_INCREMENT)
+    else:
+        view = cells[run]
+        view += view < 255
+
+
+def rasterize(lines: list[Line]) -> Raster:
+    """Return the count of lines covering each point in the bounds of the lines.
+
+    Every line is written as a single slice of the flat cells: rows are
+    consecutive cells, columns are width cells apart, and diagonals are
+    width plus or minus one cells apart.
+    """
+    xs = [x for line in lines for x in (line.start.x, line.stop.x)]
+    ys = [y for line in lines for y in (line.start.y, line.stop.y)]
+    left, top = min(xs), min(ys)
+    width, height = max(xs) - left + 1, max(ys) - top + 1
+    if np is None:
+        cells: Cells = bytearray(width * height)
+    else:
+        cells = np.zeros(width * height, dtype=np.uint8)
+    for line in lines:
+        (x, y), (dx, dy) = line.start, line.step
+        start = (y - top) * width + (x - left)
+        increment_run(cells, start, dy * width + dx, line.count)
+    return Raster(cells, left, top, width, height)
+
+
+def count_overlaps(raster: Raster) -> int:
+    """Return the number of points covered by at least two lines."""
+    cells = raster.cells
+    if isinstance(cells, bytearray):
+        return len(cells) - cells.count(0) - cells.count(1)
+    return int(np.count_nonzero(cells >= 2))
+
+
+def test_rasterize() -> None:
+    lines = parse_segments(TEST_SEGMENTS)
+    raster = rasterize(lines)
+    assert (raster.left, raster.top, raster.width, raster.height) == (0, 0, 10, 10)
+    assert bytes(raster.cells[90:100]) == bytes([2, 2, 2, 1, 1, 1, 0, 0, 0, 0])
+    assert count_overlaps(raster) == solve_part_two(TEST_SEGMENTS)
+    horizontal_and_vertical = [
+        line for line in lines if line.is_horizontal or line.is_vertical
+    ]
+    actual = count_overlaps(rasterize(horizontal_and_vertical))
+    assert actual == solve_part_one(TEST_SEGMENTS)
+    point = Line(Point(1, 1), Point(1, 1))
+    raster = rasterize([point, point, Line(Point(0, 1), Point(2, 1))])
+    assert bytes(raster.cells) == bytes([1, 3, 1])
+
+
+def test_increment_run_saturates() -> None:
+    raster = rasterize([Line(Point(3, 1), Point(1, 3))] * 300)
+    assert bytes(raster.cells) == bytes([0, 0, 255, 0, 255, 0, 255, 0, 0])
+
+
+Tile = tuple[int, int]
+
+
+class TiledPlane:
+    """Represent the count of lines covering each point of the plane.
+
+    The plane is split into square tiles of counts that are only
+    allocated once a line lands on them. If max_bytes is set, the least
+    recently used tiles beyond it are spilled to a memory-mapped file and
+    read back the next time a line lands on them.
+    """
+
+    def __init__(self, tile_size: int = 256, max_bytes: Optional[int] = None):
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.left = self.top = math.inf
+        self.right = self.bottom = -math.inf
+        self._tile_bytes = tile_size * tile_size
+        self._tiles: OrderedDict[Tile, bytearray] = OrderedDict()
+        self._slots: dict[Tile, int] = {}
+        self._spill_file: Optional[BinaryIO] = None
+        self._spill: Optional[mmap.mmap] = None
+
+    def add(self, line: Line) -> None:
+        """Increment the count of every point on the line."""
+        (x, y), (dx, dy), count = line.start, line.step, line.count
+        self.left = min(self.left, line.start.x, line.stop.x)
+        self.right = max(self.right, line.start.x, line.stop.x)
+        self.top = min(self.top, line.start.y, line.stop.y)
+        self.bottom = max(self.bottom, line.start.y, line.stop.y)
+        size = self.tile_size
+        while count:
+            # Write the part of the line that lies in the current tile.
+            tile_x, offset_x = divmod(x, size)
+            tile_y, offset_y = divmod(y, size)
+            steps = count
+            if dx:
+                steps = min(steps, size - offset_x if dx > 0 else offset_x + 1)
+            if dy:
+                steps = min(steps, size - offset_y if dy > 0 else offset_y + 1)
+            tile = self._load((tile_x, tile_y))
+            increment_run(tile, offset_y * size + offset_x, dy * size + dx, steps)
+            x, y, count = x + dx * steps, y + dy * steps, count - steps
+
+    def __getitem__(self, point: Point) -> int:
+        """Return the count of lines covering the point."""
+        tile_x, offset_x = divmod(point.x, self.tile_size)
+        tile_y, offset_y = divmod(point.y, self.tile_size)
+        cell = offset_y * self.tile_size + offset_x
+        cells = self._read((tile_x, tile_y), cell, cell + 1)
+        if cells is None:
+            return 0
+        return cells[0]
+
+    def row(self, y: int, left: int, right: int) -> bytearray:
+        """Return the counts of the points in row y from left to right."""
+        size = self.tile_size
+        row = bytearray(right - left + 1)
+        tile_y, offset_y = divmod(y, size)
+        for tile_x in range(left // size, (right // size) + 1):
+            first = max(left, tile_x * size)
+            last = min(right, (tile_x * size) + size - 1)
+            start = (offset_y * size) + first - (tile_x * size)
+            cells = self._read((tile_x, tile_y), start, start + last - first + 1)
+            if cells is not None:
+                row[first - left : last - left + 1] = cells
+        return row
+
+    def max_count(self) -> int:
+        """Return the highest count of lines covering any point."""
+        return max((max(self._read(tile) or b"\0") for tile in self.tiles), default=0)
+
+    @property
+    def tiles(self) -> list[Tile]:
+        """Return the tiles that have been allocated."""
+        return sorted(set(self._tiles).union(self._slots))
+
+    @property
+    def resident_bytes(self) -> int:
+        """Return the number of bytes used by tiles held in memory."""
+        return len(self._tiles) * self._tile_bytes
+
+    def overlaps_per_tile(self) -> dict[Tile, int]:
+        """Return the number of points covered by at least two lines in each tile."""
+        overlaps: dict[Tile, int] = {}
+        for tile in self.tiles:
+            cells = self._read(tile)
+            assert cells is not None
+            overlaps[tile] = len(cells) - cells.count(0) - cells.count(1)
+        return overlaps
+
+    def count_overlaps(self) -> int:
+        """Return the number of points covered by at least two lines."""
+        return sum(self.overlaps_per_tile().values())
+
+    def close(self) -> None:
+        """Release the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self._slots.clear()
+
+    def _read(
+        self, tile: Tile, start: int = 0, stop: Optional[int] = None
+    ) -> Optional[Union[bytearray, bytes]]:
+        """Return a span of the cells of the tile without loading it.
+
+        Return None if the tile is unallocated.
+        """
+        if stop is None:
+            stop = self._tile_bytes
+        cells = self._tiles.get(tile)
+        if cells is not None:
+            return cells[start:stop]
+        slot = self._slots.get(tile)
+        if slot is None or self._spill is None:
+            return None
+        offset = slot * self._tile_bytes
+        return self._spill[offset + start : offset + stop]
+
+    def _load(self, tile: Tile) -> bytearray:
+        """Return the cells of the tile, allocating or reading them back if needed."""
+        cells = self._tiles.get(tile)
+        if cells is not None:
+            self._tiles.move_to_end(tile)
+            return cells
+        read = self._read(tile)
+        cells = bytearray(self._tile_bytes) if read is None else bytearray(read)
+        self._tiles[tile] = cells
+        if self.max_bytes is not None:
+            while len(self._tiles) > 1 and self.resident_bytes > self.max_bytes:
+                self._spill_tile(*self._tiles.popitem(last=False))
+        return cells
+
+    def _spill_tile(self, tile: Tile, cells: bytearray) -> None:
+        """Write the cells of the tile to its slot in the spill file."""
+        slot = self._slots.setdefault(tile, len(self._slots))
+        end = (slot + 1) * self._tile_bytes
+        if self._spill is None or len(self._spill) < end:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile()
+            capacity = max(end, 2 * len(self._spill) if self._spill else 0)
+            self._spill_file.truncate(capacity)
+            if self._spill is not None:
+                self._spill.close()
+            self._spill = mmap.mmap(self._spill_file.fileno(), capacity)
+        self._spill[end - self._tile_bytes : end] = cells
+
+
+def test_tiled_plane() -> None:
+    plane = TiledPlane(tile_size=4)
+    for line in parse_segments(TEST_SEGMENTS):
+        plane.add(line)
+    assert plane.tiles == [(x, y) for x in range(3) for y in range(3)]
+    assert plane.overlaps_per_tile()[1, 1] == 4
+    assert plane.count_overlaps() == 12
+    assert [plane[Point(x, 4)] for x in range(10)] == [0, 1, 1, 2, 3, 1, 3, 2, 1, 1]
+    assert plane[Point(-5, 100)] == 0
+    plane = TiledPlane(tile_size=4)
+    plane.add(Line(Point(1000, -1000), Point(1003, -1000)))
+    assert plane.tiles == [(250, -250)]
+    plane.add(Line(Point(1001, -1000), Point(1001, -1000)))
+    assert plane[Point(1001, -1000)] == 2
+    assert solve_part_one(["0,0 -> 0,0", "0,0 -> 2,0"]) == 1
+    assert solve_part_two(["0,0 -> 0,0", "0,0 -> 2,0"]) == 1
+
+
+def test_render_intersections(tmp_path: Path) -> None:
+    plane = TiledPlane(tile_size=4)
+    for line in parse_segments(TEST_SEGMENTS):
+        plane.add(line)
+    image = tmp_path / "plane.pgm"
+    render_intersections(plane, image)
+    header = b"P5\n10 10\n3\n"
+    assert image.read_bytes()[: len(header)] == header
+    assert image.read_bytes()[-10:] == bytes([2, 2, 2, 1, 1, 1, 0, 0, 0, 0])
+    text = tmp_path / "plane.txt.gz"
+    render_intersections(plane, text)
+    with gzip.open(text) as f:
+        assert f.read().decode().split()[4] == ".112313211"
+    downsampled = tmp_path / "downsampled.txt"
+    render_intersections(plane, downsampled, scale=3)
+    assert downsampled.read_text().split() == ["212.", "1331", "1.1.", "21.."]
+    empty = TiledPlane()
+    render_intersections(empty, image)
+    assert image.read_bytes() == b"P5\n0 0\n1\n"
+    render_intersections(empty, downsampled)
+    assert downsampled.read_text() == ""
+    pretty_print_intersections(empty)
+
+
+def test_tiled_plane_spills() -> None:
+    lines = parse_segments(TEST_SEGMENTS)
+    plane = TiledPlane(tile_size=2, max_bytes=8)
+    for line in lines * 2:
+        plane.add(line)
+    assert plane.resident_bytes <= 8
+    assert plane.count_overlaps() == count_overlaps(rasterize(lines * 2))
+    assert plane[Point(0, 9)] == 4
+    plane.close()
+
+
+def clip(line: Line, top: int, bottom: int) -> Optional[Line]:
+    """Return the part of the line in the rows from top to bottom, if any."""
+    (x, y), (dx, dy), count = line.start, line.step, line.count
+    if dy > 0:
+        first, last = max(0, top - y), min(count - 1, bottom - y)
+    elif dy < 0:
+        first, last = max(0, y - bottom), min(count - 1, y - top)
+    elif top <= y <= bottom:
+        first, last = 0, count - 1
+    else:
+        return None
+    if first > last:
+        return None
+    return Line(
+        Point(x + dx * first, y + dy * first), Point(x + dx * last, y + dy * last)
+    )
+
+
+def count_band_overlaps(lines: list[Line]) -> int:
+    """Return the number of points covered by at least two lines clipped to a band."""
+    if not lines:
+        return 0
+    return count_overlaps(rasterize(lines))
+
+
+def count_overlaps_in_parallel(
+    lines: list[Line], bands: Optional[int] = None, workers: Optional[int] = None
+) -> int:
+    """Return the number of points covered by at least two lines.
+
+    The plane is split into horizontal bands of rows. Each line is
+    clipped to the bands it crosses, and each band is rasterized by a
+    worker process. Bands do not share points, so their overlap counts
+    are summed.
+    """
+    workers = workers or os.cpu_count() or 1
+    bands = bands or workers
+    ys = [y for line in lines for y in (line.start.y, line.stop.y)]
+    if not ys:
+        return 0
+    top = min(ys)
+    band_height = -(-(max(ys) - top + 1) // bands)
+    routed: list[list[Line]] = [[] for _ in range(bands)]
+    for line in lines:
+        first_y, last_y = sorted((line.start.y, line.stop.y))
+        for band in range(
+            (first_y - top) // band_height, (last_y - top) // band_height + 1
+        ):
+            band_top = top + band * band_height
+            clipped = clip(line, band_top, band_top + band_height - 1)
+            if clipped is not None:
+                routed[band].append(clipped)
+    with ProcessPoolExecutor(workers) as executor:
+        return sum(executor.map(count_band_overlaps, routed))
+
+
+def test_clip() -> None:
+    line = Line(Point(8, 0), Point(0, 8))
+    assert clip(line, 2, 4) == Line(Point(6, 2), Point(4, 4))
+    assert clip(Line(Point(0, 8), Point(8, 0)), 2, 4) == Line(Point(4, 4), Point(6, 2))
+    assert clip(Line(Point(0, 9), Point(5, 9)), 2, 4) is None
+    assert clip(Line(Point(7, 0), Point(7, 4)), 4, 9) == Line(Point(7, 4), Point(7, 4))
+
+
+def test_count_overlaps_in_parallel() -> None:
+    lines = parse_segments(TEST_SEGMENTS)
+    assert count_overlaps_in_parallel(lines, bands=3, workers=2) == 12
+    assert count_overlaps_in_parallel(lines, bands=20, workers=2) == 12
+    assert count_overlaps_in_parallel([Line(Point(1, 1), Point(1, 1))] * 2) == 1
+
+
+HORIZONTAL, VERTICAL, DIAGONAL, ANTIDIAGONAL = range(4)
+FAMILIES = (HORIZONTAL, VERTICAL, DIAGONAL, ANTIDIAGONAL)
+
+Interval = tuple[int, int]
+
+
+def key_of(family: int, point: Point) -> int:
+    """Return the key of the line of the family that passes through the point.
+
+    Horizontal lines are keyed by y, vertical lines by x, diagonal lines
+    by x - y, and antidiagonal lines by x + y.
+    """
+    if family == HORIZONTAL:
+        return point.y
+    if family == VERTICAL:
+        return point.x
+    if family == DIAGONAL:
+        return point.x - point.y
+    return point.x + point.y
+
+
+def position_of(family: int, point: Point) -> int:
+    """Return the position of the point along a line of the family."""
+    return point.y if family == VERTICAL else point.x
+
+
+def locate(family: int, key: int, position: int) -> Point:
+    """Return the point at the position along the line of the family with the key."""
+    if family == HORIZONTAL:
+        return Point(position, key)
+    if family == VERTICAL:
+        return Point(key, position)
+    if family == DIAGONAL:
+        return Point(position, position - key)
+    return Point(position, key - position)
+
+
+def classify(line: Line) -> tuple[int, int, Interval]:
+    """Return the family and key of the line and the interval of positions it covers."""
+    dx, dy = line.step
+    if dy == 0:
+        family = HORIZONTAL
+    elif dx == 0:
+        family = VERTICAL
+    elif dx == dy:
+        family = DIAGONAL
+    else:
+        family = ANTIDIAGONAL
+    first = position_of(family, line.start)
+    last = position_of(family, line.stop)
+    return family, key_of(family, line.start), (min(first, last), max(first, last))
+
+
+def sweep(intervals: list[Interval]) -> tuple[list[Interval], list[Interval]]:
+    """Return the sorted intervals covered at least once and at least twice."""
+    changes: Counter[int] = Counter()
+    for first, last in intervals:
+        changes[first] += 1
+        changes[last + 1] -= 1
+    covered: list[Interval] = []
+    overlapped: list[Interval] = []
+    depth = 0
+    covered_from = overlapped_from = 0
+    for position in sorted(changes):
+        previous, depth = depth, depth + changes[position]
+        if previous < 1 <= depth:
+            covered_from = position
+        elif depth < 1 <= previous:
+            covered.append((covered_from, position - 1))
+        if previous < 2 <= depth:
+            overlapped_from = position
+        elif depth < 2 <= previous:
+            overlapped.append((overlapped_from, position - 1))
+    return covered, overlapped
+
+
+def contains(intervals: Optional[list[Interval]], position: int) -> bool:
+    """Return True if one of the sorted, disjoint intervals contains the position."""
+    if not intervals:
+        return False
+    idx = bisect_right(intervals, (position, math.inf)) - 1
+    return idx >= 0 and intervals[idx][1] >= position
+
+
+def count_overlaps_analytic(lines: list[Line]) -> int:
+    """Return the number of points covered by at least two lines.
+
+    Lines are grouped by family and key, and the lines in each group are
+    merged into the intervals they cover at least once and at least
+    twice. A point is then covered by at least two lines if it is in an
+    interval covered twice, or if it is covered by lines of two or more
+    families. The latter points are found by looking up, for each
+    interval, the keys of the other family that it crosses, so the cost
+    depends on the number of lines and crossings, not on the area.
+    """
+    groups: defaultdict[tuple[int, int], list[Interval]] = defaultdict(list)
+    for line in lines:
+        family, key, interval = classify(line)
+        groups[family, key].append(interval)
+    covered: list[dict[int, list[Interval]]] = [{} for _ in FAMILIES]
+    overlapped: list[dict[int, list[Interval]]] = [{} for _ in FAMILIES]
+    total = 0
+    for (family, key), intervals in groups.items():
+        covered[family][key], overlapped[family][key] = sweep(intervals)
+        total += sum(last - first + 1 for (first, last) in overlapped[family][key])
+    crossings: set[Point] = set()
+    for family in FAMILIES:
+        for other in FAMILIES[family + 1 :]:
+            other_keys = sorted(covered[other])
+            for key, intervals in covered[family].items():
+                # The key of the other family changes linearly along this line.
+                offset = key_of(other, locate(family, key, 0))
+                slope = key_of(other, locate(family, key, 1)) - offset
+                for first, last in intervals:
+                    low, high = sorted((offset + slope * first, offset + slope * last))
+                    for other_key in other_keys[
+                        bisect_left(other_keys, low) : bisect_right(other_keys, high)
+                    ]:
+                        position, remainder = divmod(other_key - offset, slope)
+                        if remainder:
+                            continue
+                        point = locate(family, key, position)
+                        if contains(
+                            covered[other][other_key], position_of(other, point)
+                        ):
+                            crossings.add(point)
+    for point in crossings:
+        # Points already counted in an overlapped interval must only be counted once.
+        depth = sum(
+            contains(
+                overlapped[family].get(key_of(family, point)),
+                position_of(family, point),
+            )
+            for family in FAMILIES
+        )
+        total += 1 - depth
+    return total
+
+
+def test_count_overlaps_analytic() -> None:
+    lines = parse_segments(TEST_SEGMENTS)
+    assert count_overlaps_analytic(lines) == solve_part_two(TEST_SEGMENTS)
+    horizontal_and_vertical = [
+        line for line in lines if line.is_horizontal or line.is_vertical
+    ]
+    actual = count_overlaps_analytic(horizontal_and_vertical)
+    assert actual == solve_part_one(TEST_SEGMENTS)
+    assert count_overlaps_analytic([Line(Point(0, 0), Point(0, 10**9))] * 2) == (
+        10**9 + 1
+    )
+
+
+def test_count_overlaps_analytic_random() -> None:
+    rng = random.Random(5)
+    for _ in range(50):
+        lines: list[Line] = []
+        for _ in range(rng.randint(1, 30)):
+            x, y, length = rng.randint(0, 20), rng.randint(0, 20), rng.randint(0, 10)
+            dx, dy = rng.choice([(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (-1, 1)])
+            lines.append(Line(Point(x, y), Point(x + dx * length, y + dy * length)))
+        plane: Counter[Point] = Counter()
+        for line in lines:
+            plane.update(line.points)
+        expected = sum(1 for point in plane if plane[point] >= 2)
+        assert count_overlaps_analytic(lines) == expected
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
@@ -53,22 +53,47 @@ In this example, after 18 days, there are a total of 26 fish. After 80 days, the
 
 Find a way to simulate lanternfish. How many lanternfish would there be after 80 days?
 """
-from typing import Counter
+from typing import Counter, Iterable, Iterator, NamedTuple, Optional
+import functools
+import math
+
+import pytest
+
+Matrix = list[list[int]]
 
 
 TEST_AGES = [3, 4, 3, 1, 2]
 
 
-def advance_time(school: Counter[int]) -> Counter[int]:
+class SpawnModel(NamedTuple):
+    """Represent how lanternfish spawn.
+
+    A fish spawns a litter of new fish every reset_period days. A new
+    fish needs newborn_delay more days before its first cycle.
+    """
+
+    reset_period: int = 7
+    newborn_delay: int = 2
+    litter_size: int = 1
+
+    @property
+    def increments(self) -> int:
+        """Return the number of gestation increments a fish can be at."""
+        return self.reset_period + self.newborn_delay
+
+
+def advance_time(
+    school: Counter[int], model: SpawnModel = SpawnModel()
+) -> Counter[int]:
     """Advance time and return the count of fish at each gestation increment."""
     new_school: Counter[int] = Counter()
-    for day in range(0, 9):
+    for day in range(0, model.increments):
         count = school[day]
         if day == 0:
             # Spawn new fish
-            new_school[8] = count
+            new_school[model.increments - 1] += count * model.litter_size
             # Reset the gestation period of the new parents.
-            new_school[6] = count
+            new_school[model.reset_period - 1] += count
         else:
             new_school[day - 1] += count
     return new_school
@@ -117,6 +142,331 @@ def test_solve_part_two() -> None:
     assert solve_part_two(TEST_AGES, days=256) == 26984457539
 
 
+@functools.lru_cache(maxsize=None)
+def transition_matrix(model: SpawnModel = SpawnModel()) -> Matrix:
+    """Return the matrix that advances the count of fish at each increment by a day.
+
+    The entry at row i and column j is the number of fish at increment i
+    tomorrow for each fish at increment j today. The matrix is cached
+    per model and must not be modified.
+    """
+    increments = model.increments
+    matrix = [[0] * increments for _ in range(increments)]
+    for day in range(1, increments):
+        matrix[day - 1][day] = 1
+    # Spawn new fish and reset the gestation period of the new parents.
+    matrix[increments - 1][0] += model.litter_size
+    matrix[model.reset_period - 1][0] += 1
+    return matrix
+
+
+def multiply(a: Matrix, b: Matrix, modulus: Optional[int] = None) -> Matrix:
+    """Return the product of two square matrices, optionally modulo the modulus."""
+    columns = list(zip(*b))
+    product = [
+        [sum(x * y for (x, y) in zip(row, column)) for column in columns] for row in a
+    ]
+    if modulus is None:
+        return product
+    return [[value % modulus for value in row] for row in product]
+
+
+def apply(
+    matrix: Matrix, vector: list[int], modulus: Optional[int] = None
+) -> list[int]:
+    """Return the product of a matrix and a vector, optionally modulo the modulus."""
+    product = [sum(x * y for (x, y) in zip(row, vector)) for row in matrix]
+    if modulus is None:
+        return product
+    return [value % modulus for value in product]
+
+
+def check_modulus(modulus: Optional[int]) -> None:
+    """Raise a ValueError if the modulus is not a positive integer."""
+    if modulus is not None and modulus < 1:
+        raise ValueError(f"The modulus must be a positive integer. Got {modulus=}.")
+
+
+def check_days(days: int) -> None:
+    """Raise a ValueError if the number of days is negative."""
+    if days < 0:
+        raise ValueError(f"The number of days must not be negative. Got {days=}.")
+
+
+class Forecaster:
+    """Forecast the number of fish after any number of days.
+
+    Advancing by n days applies the transition raised to the nth power,
+    which is the product of the transition raised to the powers of two
+    in n. Those powers are computed by repeated squaring and cached, so
+    each forecast needs O(log n) matrix-vector products. With a modulus,
+    every count is kept modulo the modulus so none grows past it.
+    """
+
+    def __init__(
+        self, model: SpawnModel = SpawnModel(), modulus: Optional[int] = None
+    ) -> None:
+        check_modulus(modulus)
+        self.model = model
+        self.modulus = modulus
+        transition = transition_matrix(model)
+        if modulus is not None:
+            transition = [[value % modulus for value in row] for row in transition]
+        self._powers: list[Matrix] = [transition]
+
+    def power(self, exponent: int) -> Matrix:
+        """Return the transition raised to the power of two with the given exponent."""
+        while len(self._powers) <= exponent:
+            square = multiply(self._powers[-1], self._powers[-1], self.modulus)
+            self._powers.append(square)
+        return self._powers[exponent]
+
+    def advance(self, school: list[int], days: int) -> list[int]:
+        """Return the count of fish at each increment after a number of days."""
+        check_days(days)
+        exponent = 0
+        while days:
+            if days & 1:
+                school = apply(self.power(exponent), school, self.modulus)
+            days >>= 1
+            exponent += 1
+        return school
+
+    def forecast(self, ages: Iterable[int], days: int) -> int:
+        """Return the number of fish after a given number of days."""
+        counts = Counter(ages)
+        school = [counts[day] for day in range(self.model.increments)]
+        total = sum(self.advance(school, days))
+        return total if self.modulus is None else total % self.modulus
+
+
+def test_forecaster() -> None:
+    forecaster = Forecaster()
+    assert forecaster.forecast(TEST_AGES, days=0) == 5
+    assert forecaster.forecast(TEST_AGES, days=18) == 26
+    assert forecaster.forecast(TEST_AGES, days=80) == 5934
+    assert forecaster.forecast(TEST_AGES, days=256) == 26984457539
+    for days in range(40):
+        assert forecaster.forecast(TEST_AGES, days) == solve_part_one(TEST_AGES, days)
+    with pytest.raises(ValueError):
+        forecaster.forecast([3, 4], -1)
+    with pytest.raises(ValueError):
+        compile_model(SpawnModel()).coefficients(-1)
+
+
+def simulate(ages: Iterable[int], model: SpawnModel = SpawnModel()) -> Iterator[int]:
+    """Yield the number of fish at the end of each day, starting with today.
+
+    The counts live in a ring of slots, one per increment, where the slot
+    at zero holds the fish about to spawn. Each day, that slot is reused
+    for their litter, which becomes the last increment once zero moves
+    forward, and the parents are added to the slot that becomes the
+    increment they reset to.
+    """
+    increments = model.increments
+    reset_period = model.reset_period
+    litter_size = model.litter_size
+    counts = Counter(ages)
+    school = [counts[day] for day in range(increments)]
+    total = sum(school)
+    zero = 0
+    while True:
+        yield total
+        spawning = school[zero]
+        school[zero] = spawning * litter_size
+        school[(zero + reset_period) % increments] += spawning
+        total += spawning * litter_size
+        zero = (zero + 1) % increments
+
+
+def test_simulate() -> None:
+    totals = simulate(TEST_AGES)
+    series = [next(totals) for _ in range(257)]
+    assert series[:4] == [5, 5, 6, 7]
+    assert series[18] == 26
+    assert series[80] == 5934
+    assert series[256] == 26984457539
+
+
+class Recurrence:
+    """Represent the linear recurrence satisfied by the number of fish.
+
+    Fish at increment zero on day n were at increment zero either one
+    reset period ago or, as part of a litter, one full set of increments
+    ago. So, with k increments, the number of fish satisfies
+
+        T(n) = T(n - reset_period) + litter_size * T(n - k)
+
+    and T(n) is a combination of T(0) through T(k - 1) whose coefficients
+    are those of x^n modulo x^k - x^(k - reset_period) - litter_size.
+    These are found by repeated squaring in O(k^2 log n) time, and the
+    squared powers of x are cached for each modulus the coefficients
+    are taken modulo.
+
+    The exact coefficients grow with n, so for far horizons they can
+    instead be taken modulo a modulus, or approximated by floats that
+    are scaled down as they grow while the logarithm of the scale is
+    kept separately.
+    """
+
+    def __init__(self, model: SpawnModel) -> None:
+        if model.reset_period < 1 or model.newborn_delay < 0 or model.litter_size < 0:
+            raise ValueError(f"Invalid spawn model. Got {model=}.")
+        self.model = model
+        self.order = model.increments
+        self._powers: dict[Optional[int], list[list[int]]] = {}
+        self._scaled_powers = [rescale(self.reduce([0.0, 1.0]), 0.0)]
+
+    def reduce(self, polynomial: list, modulus: Optional[int] = None) -> list:
+        """Return the polynomial modulo the characteristic polynomial.
+
+        Integer coefficients are also reduced modulo the modulus.
+        """
+        polynomial = polynomial + [0] * (self.order - len(polynomial))
+        for degree in range(len(polynomial) - 1, self.order - 1, -1):
+            coefficient = polynomial[degree]
+            polynomial[degree - self.model.reset_period] += coefficient
+            polynomial[degree - self.order] += self.model.litter_size * coefficient
+        if modulus is None:
+            return polynomial[: self.order]
+        return [coefficient % modulus for coefficient in polynomial[: self.order]]
+
+    def multiply(self, a: list, b: list, modulus: Optional[int] = None) -> list:
+        """Return the product of two reduced polynomials, reduced."""
+        product = [0] * (len(a) + len(b) - 1)
+        for i, x in enumerate(a):
+            if x:
+                for j, y in enumerate(b):
+                    product[i + j] += x * y
+        return self.reduce(product, modulus)
+
+    def power(self, exponent: int, modulus: Optional[int] = None) -> list[int]:
+        """Return x raised to the power of two with the given exponent, reduced."""
+        powers = self._powers.setdefault(modulus, [self.reduce([0, 1], modulus)])
+        while len(powers) <= exponent:
+            powers.append(self.multiply(powers[-1], powers[-1], modulus))
+        return powers[exponent]
+
+    def coefficients(self, days: int, modulus: Optional[int] = None) -> list[int]:
+        """Return the coefficients of T(0) through T(k - 1) in T(days)."""
+        check_days(days)
+        result = self.reduce([1], modulus)
+        exponent = 0
+        while days:
+            if days & 1:
+                result = self.multiply(result, self.power(exponent, modulus), modulus)
+            days >>= 1
+            exponent += 1
+        return result
+
+    def scaled_coefficients(self, days: int) -> tuple[list[float], float]:
+        """Return the coefficients of T(days), scaled down, and the log of the scale."""
+        check_days(days)
+        result, log_scale = rescale(self.reduce([1.0]), 0.0)
+        exponent = 0
+        while days:
+            if days & 1:
+                while len(self._scaled_powers) <= exponent:
+                    square, log_square = self._scaled_powers[-1]
+                    self._scaled_powers.append(
+                        rescale(self.multiply(square, square), 2 * log_square)
+                    )
+                power, log_power = self._scaled_powers[exponent]
+                result, log_scale = rescale(
+                    self.multiply(result, power), log_scale + log_power
+                )
+            days >>= 1
+            exponent += 1
+        return result, log_scale
+
+
+def rescale(polynomial: list[float], log_scale: float) -> tuple[list[float], float]:
+    """Return the polynomial over its largest coefficient, and the new log scale."""
+    largest = max(polynomial)
+    if not largest:
+        return polynomial, log_scale
+    return [c / largest for c in polynomial], log_scale + math.log(largest)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_model(model: SpawnModel) -> Recurrence:
+    """Return the recurrence of the model, cached per model."""
+    return Recurrence(model)
+
+
+def solve_recurrence(
+    ages: Iterable[int],
+    days: int,
+    model: SpawnModel = SpawnModel(),
+    modulus: Optional[int] = None,
+) -> int:
+    """Return the number of fish after a given number of days.
+
+    If a modulus is given, return the number of fish modulo the modulus.
+    """
+    check_modulus(modulus)
+    check_days(days)
+    recurrence = compile_model(model)
+    totals = simulate(ages, model)
+    initial = [next(totals) for _ in range(recurrence.order)]
+    if days < recurrence.order:
+        total = initial[days]
+    else:
+        coefficients = recurrence.coefficients(days, modulus)
+        total = sum(c * total for (c, total) in zip(coefficients, initial))
+    return total if modulus is None else total % modulus
+
+
+def estimate_log_population(
+    ages: Iterable[int], days: int, model: SpawnModel = SpawnModel()
+) -> float:
+    """Return an estimate of the natural log of the number of fish after some days."""
+    check_days(days)
+    recurrence = compile_model(model)
+    totals = simulate(ages, model)
+    initial = [next(totals) for _ in range(recurrence.order)]
+    if days < recurrence.order:
+        return math.log(initial[days]) if initial[days] else -math.inf
+    coefficients, log_scale = recurrence.scaled_coefficients(days)
+    total = sum(c * total for (c, total) in zip(coefficients, initial))
+    return log_scale + math.log(total) if total else -math.inf
+
+
+def test_solve_recurrence() -> None:
+    assert solve_recurrence(TEST_AGES, days=80) == 5934
+    assert solve_recurrence(TEST_AGES, days=256) == 26984457539
+    for model in [SpawnModel(), SpawnModel(5, 0, 1), SpawnModel(3, 4, 2)]:
+        totals = simulate(TEST_AGES, model)
+        school = Counter(TEST_AGES)
+        forecaster = Forecaster(model)
+        for days in range(60):
+            expected = next(totals)
+            assert school.total() == expected
+            assert forecaster.forecast(TEST_AGES, days) == expected
+            assert solve_recurrence(TEST_AGES, days, model) == expected
+            school = advance_time(school, model)
+
+
+def test_modular_and_log_populations() -> None:
+    prime = 1_000_000_007
+    assert solve_recurrence(TEST_AGES, 256, modulus=prime) == 26984457539 % prime
+    assert Forecaster(modulus=prime).forecast(TEST_AGES, 256) == 26984457539 % prime
+    exact = solve_recurrence(TEST_AGES, 5000)
+    assert solve_recurrence(TEST_AGES, 5000, modulus=prime) == exact % prime
+    assert Forecaster(modulus=prime).forecast(TEST_AGES, 5000) == exact % prime
+    for days in [0, 8, 256, 5000]:
+        expected = math.log(solve_recurrence(TEST_AGES, days))
+        assert math.isclose(estimate_log_population(TEST_AGES, days), expected)
+    assert solve_recurrence(TEST_AGES, 10**100, modulus=prime) >= 0
+    assert estimate_log_population(TEST_AGES, 10**100) > 10**98
+    with pytest.raises(ValueError):
+        solve_recurrence(TEST_AGES, 10, modulus=0)
+    with pytest.raises(ValueError):
+        solve_recurrence(TEST_AGES, -1)
+    with pytest.raises(ValueError):
+        estimate_log_population(TEST_AGES, -1)
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
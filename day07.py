@@ -36,8 +36,19 @@ Determine the horizontal position that the crabs can align to using the least fu
 
 """
 
-from typing import NamedTuple
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+from typing import Callable, NamedTuple, Optional
 import math
+import random
+
+import pytest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to the cost curve.
+    np = None
 
 
 TEST_INPUT = [16, 1, 2, 0, 4, 2, 7, 1, 2, 14]
@@ -67,9 +78,59 @@ def test_determine_best_position() -> None:
     assert actual == expected
 
 
+def choose_position(low: int, high: int, positions: list[int]) -> int:
+    """Return the position that determine_best_position() picks among tied positions.
+
+    Positions from low to high are tied. Positions that crabs start at are
+    preferred, in the order the crabs are listed, followed by the lowest.
+    """
+    for position in positions:
+        if low <= position <= high:
+            return position
+    return low
+
+
+def quickselect(values: list[int], k: int) -> int:
+    """Return the kth smallest value, counting from zero, in expected linear time."""
+    while True:
+        pivot = random.choice(values)
+        lower = [value for value in values if value < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        k -= len(lower)
+        equal = values.count(pivot)
+        if k < equal:
+            return pivot
+        k -= equal
+        values = [value for value in values if value > pivot]
+
+
+def determine_best_position_by_median(positions: list[int]) -> PositionAndCost:
+    """Return the position to move all crabs to that minimizes fuel spent.
+
+    Assume crab ships burn one fuel per unit of movement. Any position
+    between the two middle positions minimizes the total distance moved.
+    """
+    low = quickselect(positions, (len(positions) - 1) // 2)
+    high = quickselect(positions, len(positions) // 2)
+    position = choose_position(low, high, positions)
+    cost = sum(abs(position - start) for start in positions)
+    return PositionAndCost(position=position, cost=cost)
+
+
+def test_determine_best_position_by_median() -> None:
+    assert determine_best_position_by_median(TEST_INPUT) == PositionAndCost(2, 37)
+    rng = random.Random(7)
+    for _ in range(100):
+        positions = [rng.randint(0, 30) for _ in range(rng.randint(1, 12))]
+        expected = determine_best_position(positions)
+        assert determine_best_position_by_median(positions) == expected
+
+
 def solve_part_one(positions: list[int]) -> int:
     """Return the minimum amount of fuel required to move all crabs to the same position."""
-    return determine_best_position(positions).cost
+    return determine_best_position_by_median(positions).cost
 
 
 def test_solve_part_one() -> None:
@@ -109,7 +170,7 @@ def solve_part_two(positions: list[int]) -> int:
 
     Take into account that the crab ships do not burn fuel at a constant rate.
     """
-    return determine_best_position_modified_burn(positions).cost
+    return determine_best_position_modified_burn_by_mean(positions).cost
 
 
 def determine_best_position_modified_burn(positions: list[int]) -> PositionAndCost:
@@ -138,6 +199,39 @@ def calculate_accelerated_fuel_cost(a: int, b: int) -> int:
     return (diff * (diff + 1)) // 2
 
 
+def determine_best_position_modified_burn_by_mean(
+    positions: list[int],
+) -> PositionAndCost:
+    """Return the position to move all crabs to that minimizes fuel spent.
+
+    Assume crab ships burn an increasing amount of fuel per unit of
+    movement. The total cost is convex and its real minimum lies within
+    half a unit of the mean position, so the best position is one of
+    the few integers around the mean.
+    """
+    floor_mean = sum(positions) // len(positions)
+    candidates = range(
+        max(min(positions), floor_mean - 1), min(max(positions), floor_mean + 2) + 1
+    )
+    costs = {
+        end: sum(calculate_accelerated_fuel_cost(start, end) for start in positions)
+        for end in candidates
+    }
+    cost = min(costs.values())
+    tied = [end for end in candidates if costs[end] == cost]
+    return PositionAndCost(choose_position(tied[0], tied[-1], positions), cost)
+
+
+def test_determine_best_position_modified_burn_by_mean() -> None:
+    expected = PositionAndCost(position=5, cost=168)
+    assert determine_best_position_modified_burn_by_mean(TEST_INPUT) == expected
+    rng = random.Random(7)
+    for _ in range(100):
+        positions = [rng.randint(0, 30) for _ in range(rng.randint(1, 12))]
+        expected = determine_best_position_modified_burn(positions)
+        assert determine_best_position_modified_burn_by_mean(positions) == expected
+
+
 def test_determine_best_position_modified_burn() -> None:
     expected = PositionAndCost(position=5, cost=168)
     actual = determine_best_position_modified_burn(TEST_INPUT)
@@ -150,6 +244,311 @@ def test_solve_part_two() -> None:
     assert actual == expected
 
 
+class CostCurve:
+    """Represent the total fuel cost of moving all crabs to any end position.
+
+    Crab positions are compressed into a sorted histogram, with prefix
+    sums of the count of crabs, their positions, and their squared
+    positions. The total distance to an end position is then the
+    distance of the crabs to its left plus that of the crabs to its
+    right, each a product and a difference of prefix sums. With
+    increasing burn, each crab spends d(d + 1) / 2 fuel to move d units,
+    and the sum of the squared distances expands into the totals of the
+    squares, positions, and counts.
+    """
+
+    def __init__(self, positions: list[int]):
+        histogram = Counter(positions)
+        self.positions = sorted(histogram)
+        counts = [histogram[position] for position in self.positions]
+        self._counts = [0, *accumulate(counts)]
+        self._sums = [0, *accumulate(p * c for (p, c) in zip(self.positions, counts))]
+        self._squares = [
+            0,
+            *accumulate(p * p * c for (p, c) in zip(self.positions, counts)),
+        ]
+
+    def _cost(self, end: int, split: int, accelerated: bool) -> int:
+        """Return the cost at the end position.
+
+        The split is the number of unique crab positions at or before it.
+        """
+        count, total, squares = self._counts[-1], self._sums[-1], self._squares[-1]
+        left_count, left_total = self._counts[split], self._sums[split]
+        distance = (
+            (end * left_count - left_total)
+            + (total - left_total)
+            - end * (count - left_count)
+        )
+        if not accelerated:
+            return distance
+        squared_distance = squares - 2 * end * total + end * end * count
+        return (squared_distance + distance) // 2
+
+    def cost(self, end: int, accelerated: bool = False) -> int:
+        """Return the total fuel spent moving all crabs to the end position."""
+        return self._cost(end, bisect_right(self.positions, end), accelerated)
+
+    def curve(
+        self,
+        accelerated: bool = False,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ) -> list[int]:
+        """Return the total fuel spent for each end position from start to stop.
+
+        The positions default to the range of crab positions. The split
+        point moves forward with the end position, so each cost takes
+        constant time.
+        """
+        start = self.positions[0] if start is None else start
+        stop = self.positions[-1] if stop is None else stop
+        split = bisect_right(self.positions, start - 1)
+        costs: list[int] = []
+        for end in range(start, stop + 1):
+            while split < len(self.positions) and self.positions[split] <= end:
+                split += 1
+            costs.append(self._cost(end, split, accelerated))
+        return costs
+
+
+def test_cost_curve() -> None:
+    curve = CostCurve(TEST_INPUT)
+    assert curve.cost(2) == 37
+    assert curve.cost(1) == 41
+    assert curve.cost(10) == 71
+    assert curve.cost(5, accelerated=True) == 168
+    assert curve.cost(2, accelerated=True) == 206
+    assert curve.cost(-3) == sum(position + 3 for position in TEST_INPUT)
+    for accelerated in (False, True):
+        costs = curve.curve(accelerated)
+        assert len(costs) == max(TEST_INPUT) - min(TEST_INPUT) + 1
+        assert costs == [curve.cost(end, accelerated) for end in range(0, 17)]
+    assert curve.curve(start=-1, stop=1) == [curve.cost(end) for end in (-1, 0, 1)]
+    rng = random.Random(7)
+    positions = [rng.randint(0, 50) for _ in range(20)]
+    curve = CostCurve(positions)
+    assert min(curve.curve()) == determine_best_position(positions).cost
+    expected = determine_best_position_modified_burn(positions).cost
+    assert min(curve.curve(accelerated=True)) == expected
+
+
+CostModel = Callable[[int], int]
+
+
+def linear_cost(distance: int) -> int:
+    """Return the fuel required to move a distance at one fuel per unit."""
+    return distance
+
+
+def triangular_cost(distance: int) -> int:
+    """Return the fuel required to move a distance when each unit costs one more."""
+    return (distance * (distance + 1)) // 2
+
+
+def quadratic_cost(distance: int) -> int:
+    """Return the fuel required to move a distance at the square of the distance."""
+    return distance * distance
+
+
+def capped_cost(cap: int, model: CostModel = linear_cost) -> CostModel:
+    """Return a cost model that never charges more than the cap."""
+
+    def cost(distance: int) -> int:
+        return min(model(distance), cap)
+
+    return cost
+
+
+def is_convex(model: CostModel, max_distance: int, samples: int = 16) -> bool:
+    """Return True if the model looks nondecreasing and convex up to the max distance.
+
+    The model is checked at small distances and at evenly spaced samples
+    up to the max distance: the slopes between consecutive samples must
+    be nonnegative and nondecreasing.
+    """
+    distances = sorted(
+        set(range(min(samples, max_distance) + 1)).union(
+            (max_distance * i) // samples for i in range(samples + 1)
+        )
+    )
+    costs = [model(distance) for distance in distances]
+    # Compare slopes by cross multiplying to avoid floats.
+    previous_rise, previous_run = 0, 1
+    for i in range(1, len(distances)):
+        rise, run = costs[i] - costs[i - 1], distances[i] - distances[i - 1]
+        if rise * previous_run < previous_rise * run:
+            return False
+        previous_rise, previous_run = rise, run
+    return True
+
+
+def scan_best_position(positions: list[int], model: CostModel) -> PositionAndCost:
+    """Return the position that minimizes fuel spent, checking every position."""
+    costs = {
+        end: sum(model(abs(end - start)) for start in positions)
+        for end in range(min(positions), max(positions) + 1)
+    }
+    cost = min(costs.values())
+    tied = {end for (end, end_cost) in costs.items() if end_cost == cost}
+    position = next((start for start in positions if start in tied), min(tied))
+    return PositionAndCost(position=position, cost=cost)
+
+
+def determine_best_position_for_model(
+    positions: list[int], model: CostModel = linear_cost, samples: int = 16
+) -> PositionAndCost:
+    """Return the position to move all crabs to that minimizes fuel spent.
+
+    Assume crab ships burn fuel according to the cost model. If the model
+    is convex, so is the total cost, and the first position where the
+    total stops decreasing is found by a ternary-style search on the
+    difference between neighboring positions, in O(n log range) cost
+    evaluations. Otherwise, every position is checked.
+    """
+    low, high = min(positions), max(positions)
+    if not is_convex(model, high - low, samples):
+        return scan_best_position(positions, model)
+
+    def total(end: int) -> int:
+        return sum(model(abs(end - start)) for start in positions)
+
+    while low < high:
+        middle = (low + high) // 2
+        if total(middle + 1) >= total(middle):
+            high = middle
+        else:
+            low = middle + 1
+    first, cost = low, total(low)
+    # Find the last of any positions tied with the first.
+    low, high = first, max(positions)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if total(middle) == cost:
+            low = middle
+        else:
+            high = middle - 1
+    return PositionAndCost(choose_position(first, low, positions), cost)
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        linear_cost,
+        triangular_cost,
+        quadratic_cost,
+        capped_cost(5),
+        capped_cost(100, triangular_cost),
+        lambda distance: distance**3,
+    ],
+)
+def test_determine_best_position_for_model(model: CostModel) -> None:
+    rng = random.Random(7)
+    for _ in range(50):
+        positions = [rng.randint(0, 40) for _ in range(rng.randint(1, 12))]
+        expected = scan_best_position(positions, model)
+        assert determine_best_position_for_model(positions, model) == expected
+
+
+def test_cost_models() -> None:
+    assert determine_best_position_for_model(TEST_INPUT) == PositionAndCost(2, 37)
+    actual = determine_best_position_for_model(TEST_INPUT, triangular_cost)
+    assert actual == PositionAndCost(5, 168)
+    assert is_convex(quadratic_cost, 100)
+    assert not is_convex(capped_cost(5), 100)
+    assert is_convex(capped_cost(500), 100)
+
+
+def vectorized_minimum(
+    positions: list[int], accelerated: bool = False, max_cells: int = 1 << 22
+) -> tuple[int, int, int]:
+    """Return the least fuel spent and the first and last end positions that cost it.
+
+    Costs are computed with NumPy by broadcasting blocks of end positions
+    against the unique crab positions, weighted by the number of crabs at
+    each. Blocks hold at most max_cells distances at once and are reduced
+    as they are computed, so memory does not grow with the range of
+    positions. Use CostCurve.curve for the cost of every end position.
+    """
+    starts, counts = np.unique(np.array(positions, dtype=np.int64), return_counts=True)
+    low, high = int(starts[0]), int(starts[-1])
+    distance = high - low
+    largest = distance * (distance + 1) // 2 if accelerated else distance
+    if 2 * largest * len(positions) >= 2**63:
+        raise OverflowError("The total fuel cost may not fit in a 64 bit integer.")
+    block = max(1, max_cells // len(starts))
+    best, first, last = -1, low, low
+    for block_low in range(low, high + 1, block):
+        ends = np.arange(block_low, min(block_low + block, high + 1), dtype=np.int64)
+        distances = np.abs(ends[:, None] - starts[None, :])
+        if accelerated:
+            distances = distances * (distances + 1) // 2
+        costs = distances @ counts
+        cost = int(costs.min())
+        if best != -1 and cost > best:
+            continue
+        tied = np.flatnonzero(costs == cost)
+        if best == -1 or cost < best:
+            best, first = cost, block_low + int(tied[0])
+        last = block_low + int(tied[-1])
+    return best, first, last
+
+
+def determine_best_position_vectorized(
+    positions: list[int], accelerated: bool = False
+) -> PositionAndCost:
+    """Return the position to move all crabs to that minimizes fuel spent.
+
+    Every end position is evaluated, with NumPy if it is available and
+    with the prefix-sum cost curve otherwise.
+    """
+    if np is not None:
+        cost, first, last = vectorized_minimum(positions, accelerated)
+        return PositionAndCost(choose_position(first, last, positions), cost)
+    curve = CostCurve(positions).curve(accelerated)
+    cost = min(curve)
+    tied_ends = [end for (end, end_cost) in enumerate(curve) if end_cost == cost]
+    low = min(positions)
+    first, last = low + tied_ends[0], low + tied_ends[-1]
+    return PositionAndCost(choose_position(first, last, positions), cost)
+
+
+def test_vectorized_minimum() -> None:
+    pytest.importorskip("numpy")
+    assert vectorized_minimum(TEST_INPUT, max_cells=7) == (37, 2, 2)
+    assert vectorized_minimum(TEST_INPUT, accelerated=True, max_cells=1) == (168, 5, 5)
+    rng = random.Random(5)
+    for _ in range(50):
+        positions = [rng.randint(-20, 20) for _ in range(rng.randint(1, 6))]
+        low = min(positions)
+        for accelerated in (False, True):
+            curve = CostCurve(positions).curve(accelerated)
+            cost = min(curve)
+            tied = [end for (end, end_cost) in enumerate(curve) if end_cost == cost]
+            expected = (cost, low + tied[0], low + tied[-1])
+            for max_cells in (1, 7, 1 << 22):
+                actual = vectorized_minimum(positions, accelerated, max_cells)
+                assert actual == expected
+    with pytest.raises(OverflowError):
+        vectorized_minimum([0, 10**10], accelerated=True)
+
+
+def test_determine_best_position_vectorized() -> None:
+    rng = random.Random(11)
+    for _ in range(50):
+        positions = [rng.randint(0, 40) for _ in range(rng.randint(1, 12))]
+        linear = determine_best_position_vectorized(positions)
+        assert linear == determine_best_position(positions)
+        assert linear == determine_best_position_by_median(positions)
+        assert linear == determine_best_position_for_model(positions)
+        accelerated = determine_best_position_vectorized(positions, accelerated=True)
+        assert accelerated == determine_best_position_modified_burn(positions)
+        assert accelerated == determine_best_position_modified_burn_by_mean(positions)
+        assert accelerated == determine_best_position_for_model(
+            positions, triangular_cost
+        )
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
@@ -72,7 +72,16 @@ Because the digits 1, 4, 7, and 8 each use a unique number of segments, you shou
 In the output values, how many times do digits 1, 4, 7, or 8 appear?
 """
 
-from typing import NamedTuple
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+import functools
+import mmap
+import random
+import time
 
 import pytest
 
@@ -328,40 +337,300 @@ def translate_signal(signals: list[str]) -> dict[frozenset[str], int]:
         frozenset([top, middle, bottom, upper_left, upper_right, lower_right]): 9,
     }
 
-def decode_output(display: Display) -> int:
-    signal_map = translate_signal(display.signal.split(' '))
-    value = [
-        str(signal_map[frozenset(output)])
-        for output in display.output.split(' ')
+# The segments lit for each digit on a correctly wired display.
+DIGIT_SEGMENTS = [
+    "abcefg",
+    "cf",
+    "acdeg",
+    "acdfg",
+    "bcdf",
+    "abdfg",
+    "abdefg",
+    "acf",
+    "abcdefg",
+    "abcdfg",
+]
+SEGMENTS = "abcdefg"
+SEGMENT_BITS = {segment: 1 << bit for (bit, segment) in enumerate(SEGMENTS)}
+
+
+def to_mask(pattern: Iterable[str]) -> int:
+    """Return the pattern as a mask with one bit per segment."""
+    return sum(SEGMENT_BITS[segment] for segment in pattern)
+
+
+@functools.lru_cache(maxsize=None)
+def wiring_table() -> dict[tuple[int, ...], dict[int, int]]:
+    """Return a map of the signals of every wiring to the digit each signal shows.
+
+    The signals of a wiring are keyed by their sorted masks, which do not
+    depend on the order the signals are listed in. Each of the 5040
+    wirings has a distinct key.
+    """
+    table: dict[tuple[int, ...], dict[int, int]] = {}
+    for wiring in permutations(SEGMENTS):
+        rewire = dict(zip(SEGMENTS, wiring))
+        digits = {
+            to_mask(rewire[segment] for segment in segments): digit
+            for (digit, segments) in enumerate(DIGIT_SEGMENTS)
+        }
+        table[tuple(sorted(digits))] = digits
+    return table
+
+
+def translate_signal_masks(signals: list[str]) -> dict[int, int]:
+    """Return a map of the masks of signals to the digits they represent."""
+    return wiring_table()[tuple(sorted(to_mask(signal) for signal in signals))]
+
+
+def decode_output_masks(display: Display) -> int:
+    """Return the output value of the display, decoded with the wiring table."""
+    digits = translate_signal_masks(display.signal.split(" "))
+    value = 0
+    for output in display.output.split(" "):
+        value = value * 10 + digits[to_mask(output)]
+    return value
+
+
+def test_decode_output_masks() -> None:
+    assert len(wiring_table()) == 5040
+    for entry in TEST_ENTRIES:
+        display = parse_entry(entry)
+        assert decode_output_masks(display) == decode_output(display)
+
+
+class WiringCache:
+    """Cache the wirings of recently decoded displays.
+
+    Wirings are keyed by the sorted masks of their signals, so a display
+    is recognized however its signals are ordered or spelled. Once the
+    cache holds maxsize wirings, the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._wirings: OrderedDict[tuple[int, ...], dict[int, int]] = OrderedDict()
+
+    def translate(self, signals: list[str]) -> dict[int, int]:
+        """Return a map of the masks of signals to the digits they represent."""
+        key = tuple(sorted(to_mask(signal) for signal in signals))
+        wiring = self._wirings.get(key)
+        if wiring is not None:
+            self.hits += 1
+            self._wirings.move_to_end(key)
+            return wiring
+        self.misses += 1
+        wiring = {
+            to_mask(segments): digit
+            for (segments, digit) in translate_signal(signals).items()
+        }
+        self._wirings[key] = wiring
+        if len(self._wirings) > self.maxsize:
+            self._wirings.popitem(last=False)
+        return wiring
+
+
+WIRING_CACHE = WiringCache()
+
+
+def decode_output(display: Display, cache: WiringCache = WIRING_CACHE) -> int:
+    signal_map = cache.translate(display.signal.split(" "))
+    value = [str(signal_map[to_mask(output)]) for output in display.output.split(" ")]
+    return int("".join(value))
+
+
+def generate_entry(rng: random.Random) -> str:
+    """Return an entry for a randomly miswired display showing a random output."""
+    rewire = dict(zip(SEGMENTS, rng.sample(SEGMENTS, len(SEGMENTS))))
+    patterns = [
+        "".join(rng.sample([rewire[segment] for segment in segments], len(segments)))
+        for segments in DIGIT_SEGMENTS
     ]
-    return int(''.join(value))
+    signals = rng.sample(patterns, len(patterns))
+    outputs = [rng.choice(patterns) for _ in range(4)]
+    return " ".join(signals) + " | " + " ".join(outputs)
+
+
+def test_wiring_cache() -> None:
+    rng = random.Random(8)
+    # A skewed workload: a few displays report far more often than the rest.
+    displays = [generate_entry(rng) for _ in range(200)]
+    weights = [1 / (rank + 1) for rank in range(len(displays))]
+    entries = rng.choices(displays, weights=weights, k=5000)
+    cache = WiringCache(maxsize=50)
+    for entry in entries:
+        display = parse_entry(entry)
+        assert decode_output(display, cache) == decode_output_masks(display)
+    assert cache.hits + cache.misses == 5000
+    assert cache.hits > 2 * cache.misses
+    unbounded = WiringCache(maxsize=len(displays))
+    for entry in entries:
+        decode_output(parse_entry(entry), unbounded)
+    assert unbounded.misses == len(set(entries))
+
+
+BYTE_BITS = {ord(segment): bit for (segment, bit) in SEGMENT_BITS.items()}
+
+
+def to_mask_bytes(pattern: bytes) -> int:
+    """Return the pattern, given as bytes, as a mask with one bit per segment."""
+    return sum(map(BYTE_BITS.__getitem__, pattern))
+
+
+def decode_line(line: bytes) -> int:
+    """Return the output value of an entry given as bytes."""
+    signal, output = line.split(b" | ")
+    key = tuple(sorted(to_mask_bytes(pattern) for pattern in signal.split()))
+    digits = wiring_table()[key]
+    value = 0
+    for pattern in output.split():
+        value = value * 10 + digits[to_mask_bytes(pattern)]
+    return value
+
+
+def find_chunks(path: Path, chunk_bytes: int) -> list[tuple[int, int]]:
+    """Return the start and stop offsets of chunks of whole lines of the file."""
+    chunks: list[tuple[int, int]] = []
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < len(mm):
+            stop = mm.find(b"\n", start + chunk_bytes)
+            stop = len(mm) if stop == -1 else stop + 1
+            chunks.append((start, stop))
+            start = stop
+    return chunks
+
+
+def decode_chunk(path: Path, start: int, stop: int) -> tuple[array, float]:
+    """Return the output values of the entries in a chunk and the time taken."""
+    began = time.perf_counter()
+    values = array("Q")
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = start
+        while position < stop:
+            end = mm.find(b"\n", position, stop)
+            end = stop if end == -1 else end
+            line = mm[position:end].strip()
+            if line:
+                values.append(decode_line(line))
+            position = end + 1
+    return values, time.perf_counter() - began
+
+
+class BatchReport(NamedTuple):
+    values: array
+    seconds: float
+    latencies: list[float]
+
+    @property
+    def throughput(self) -> float:
+        """Return the number of entries decoded per second."""
+        return len(self.values) / self.seconds if self.seconds else 0.0
+
+
+def decode_file(
+    path: Path, chunk_bytes: int = 1 << 20, workers: Optional[int] = None
+) -> BatchReport:
+    """Return the output values of every entry in the file, decoded in parallel.
+
+    The file is memory-mapped and split into chunks of whole lines, and
+    each chunk is decoded by a worker process that maps the file itself,
+    so entries are never copied into an intermediate list.
+    """
+    began = time.perf_counter()
+    values = array("Q")
+    latencies: list[float] = []
+    if path.stat().st_size:
+        chunks = find_chunks(path, chunk_bytes)
+        with ProcessPoolExecutor(workers) as executor:
+            starts, stops = zip(*chunks)
+            results = executor.map(decode_chunk, [path] * len(chunks), starts, stops)
+            for chunk_values, latency in results:
+                values.extend(chunk_values)
+                latencies.append(latency)
+    return BatchReport(values, time.perf_counter() - began, latencies)
+
+
+def test_decode_file(tmp_path: Path) -> None:
+    path = tmp_path / "entries.txt"
+    path.write_text("\n".join(TEST_ENTRIES) + "\n\n")
+    report = decode_file(path, chunk_bytes=100, workers=2)
+    expected = [decode_output_masks(parse_entry(entry)) for entry in TEST_ENTRIES]
+    assert report.values.tolist() == expected
+    assert len(report.latencies) == len(find_chunks(path, 100))
+    assert report.throughput > 0
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    assert decode_file(empty).values.tolist() == []
+
 
 def solve_part_two(entries: list[str]) -> int:
     parsed = [parse_entry(entry) for entry in entries]
-    return sum(decode_output(display) for display in parsed)
+    return sum(decode_output_masks(display) for display in parsed)
 
 def test_solve_part_two() -> None:
     expected = 61229
     actual = solve_part_two(TEST_ENTRIES)
     assert actual == expected
 
+UNIQUE_DIGITS = {1, 4, 7, 8}
+
+
+class Summary(NamedTuple):
+    unique_digits: int
+    output_sum: int
+    histogram: Optional[list[int]]
+
+
+def summarize(entries: Iterable[str], histogram: bool = False) -> Summary:
+    """Return the answers to both parts from a single pass over the entries.
+
+    Each entry is parsed once into masks. If histogram is True, also
+    count how many times each digit appears in the output values.
+    """
+    table = wiring_table()
+    unique_digits = 0
+    output_sum = 0
+    counts = [0] * 10 if histogram else None
+    for entry in entries:
+        signal, output = entry.split(" | ")
+        digits = table[tuple(sorted(to_mask(pattern) for pattern in signal.split(" ")))]
+        value = 0
+        for pattern in output.split(" "):
+            digit = digits[to_mask(pattern)]
+            value = value * 10 + digit
+            unique_digits += digit in UNIQUE_DIGITS
+            if counts is not None:
+                counts[digit] += 1
+        output_sum += value
+    return Summary(unique_digits, output_sum, counts)
+
+
+def test_summarize() -> None:
+    summary = summarize(TEST_ENTRIES, histogram=True)
+    assert summary.unique_digits == solve_part_one(TEST_ENTRIES)
+    assert summary.output_sum == solve_part_two(TEST_ENTRIES)
+    assert summary.histogram is not None
+    assert sum(summary.histogram) == 4 * len(TEST_ENTRIES)
+    assert sum(summary.histogram[d] for d in UNIQUE_DIGITS) == summary.unique_digits
+    assert summarize(TEST_ENTRIES).histogram is None
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
     input_file = Path("./input08.txt")
     with input_file.open() as f:
-        entries = [
-            line.strip("\n").strip()
-            for line in f.readlines()
-            if line.strip("\n").strip()
-        ]
+        summary = summarize(line.strip() for line in f if line.strip())
     print(
         "In the output values, how many times do digits 1, 4, 7, or 8 appear?",
-        solve_part_one(entries),
+        summary.unique_digits,
         sep="\n\t",
     )
     print(
         "For each entry, determine all of the wire/segment connections and decode the four-digit output values. What do you get if you add up all of the output values?",
-        solve_part_two(entries),
+        summary.output_sum,
         sep="\n\t",
     )
@@ -25,9 +25,21 @@ Find all of the low points on your heightmap. What is the sum of the risk levels
 
 """
 
-from typing import NamedTuple
+from collections import deque
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Sequence, Union
+import heapq
 import pytest
 import math
+import mmap
+import random
+
+from grid import BORDER, DIGITS, ORTHOGONAL, DigitGrid
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to pure Python.
+    np = None
 
 TEST_HEIGHTMAP = [
     "2199943210",
@@ -45,17 +57,18 @@ TEST_GRID = [
 ]
 
 Grid = list[list[int]]
+Heights = Union[Grid, DigitGrid]
 
 
-def find_lowpoints(grid: Grid) -> list[int]:
+def find_lowpoints(grid: Heights) -> list[int]:
     """Return a list of heights that are local minima."""
-    lowpoints: list[int] = []
-    for row_idx, row in enumerate(grid):
-        for height_idx, height in enumerate(row):
-            neighbors = find_neighbors(grid, row_idx, height_idx)
-            if height < min(neighbors):
-                lowpoints.append(height)
-    return lowpoints
+    heights = DigitGrid.of(grid)
+    cells, offsets = heights.cells, heights.orthogonal_offsets
+    return [
+        cells[cell]
+        for cell in heights.indices()
+        if all(cells[cell] < cells[cell + offset] for offset in offsets)
+    ]
 
 
 def test_find_lowpoints() -> None:
@@ -66,16 +79,10 @@ def test_find_lowpoints() -> None:
 
 def find_neighbors(grid: Grid, row: int, column: int) -> list[int]:
     """Return the value of the cardinally adjacent neighbors to the element at the given index."""
-    max_row = len(grid) - 1
-    max_column = len(grid[0]) - 1
-    up = (row - 1, column)
-    down = (row + 1, column)
-    left = (row, column - 1)
-    right = (row, column + 1)
     return [
-        grid[row][column]
-        for (row, column) in (up, down, left, right)
-        if 0 <= row <= max_row and 0 <= column <= max_column
+        grid[row + dy][column + dx]
+        for dx, dy in ORTHOGONAL
+        if 0 <= row + dy < len(grid) and 0 <= column + dx < len(grid[0])
     ]
 
 
@@ -94,10 +101,55 @@ def test_find_neighbors(grid: Grid, row: int, column: int, expected: list[int])
     assert sorted(find_neighbors(grid, row, column)) == sorted(expected)
 
 
-def solve_part_one(grid: Grid) -> int:
+def find_lowpoints_vectorized(grid: Heights) -> "np.ndarray":
+    """Return an array of heights that are local minima.
+
+    The padded cells of the grid are viewed as a two-dimensional array
+    without copying, and compared with their four shifted copies at once.
+    """
+    heights = DigitGrid.of(grid)
+    if not len(heights):
+        return np.zeros(0, dtype=np.uint8)
+    padded = np.frombuffer(heights.cells, dtype=np.uint8)
+    padded = padded.reshape(heights.height + 2, heights.stride)
+    center = padded[1:-1, 1:-1]
+    lowpoints = (
+        (center < padded[:-2, 1:-1])
+        & (center < padded[2:, 1:-1])
+        & (center < padded[1:-1, :-2])
+        & (center < padded[1:-1, 2:])
+    )
+    return center[lowpoints]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_lowpoints_paths_agree(seed: int) -> None:
+    rng = random.Random(seed)
+    grid = [[rng.randrange(10) for _ in range(17)] for _ in range(11)]
+    expected = sorted(
+        height
+        for y, row in enumerate(grid)
+        for x, height in enumerate(row)
+        if height < min(find_neighbors(grid, y, x))
+    )
+    assert sorted(find_lowpoints(grid)) == expected
+    if np is not None:
+        assert sorted(find_lowpoints_vectorized(grid).tolist()) == expected
+
+
+def solve_part_one(grid: Heights) -> int:
     """Return the sum of the risk levels on all low points of the hightmap."""
-    local_minima = find_lowpoints(grid)
-    return sum(minima + 1 for minima in local_minima)
+    if np is not None:
+        local_minima = find_lowpoints_vectorized(grid)
+        return int(local_minima.sum(dtype=np.int64)) + len(local_minima)
+    return sum(minima + 1 for minima in find_lowpoints(grid))
+
+
+def test_solve_part_one() -> None:
+    assert solve_part_one(TEST_GRID) == 15
+    assert solve_part_one(DigitGrid.from_rows(TEST_GRID)) == 15
+    assert solve_part_one([]) == 0
+    assert find_lowpoints([]) == []
 
 
 def convert_heightmap_to_grid(heightmap: list[str]) -> Grid:
@@ -164,17 +216,15 @@ class Point(NamedTuple):
     value: int
 
 
-def find_lowpoint_coordinates(grid: Grid) -> list[Point]:
+def find_lowpoint_coordinates(grid: Heights) -> list[Point]:
     """Return a list of heights that are local minima."""
-    lowpoints: list[Point] = []
-    for row_idx, row in enumerate(grid):
-        for height_idx, height in enumerate(row):
-            neighbors = find_neighbors(grid, row_idx, height_idx)
-            if height < min(neighbors):
-                lowpoints.append(
-                    Point(x=height_idx, y=row_idx, value=grid[row_idx][height_idx])
-                )
-    return lowpoints
+    heights = DigitGrid.of(grid)
+    cells, offsets = heights.cells, heights.orthogonal_offsets
+    return [
+        Point(*heights.coordinates(cell), value=cells[cell])
+        for cell in heights.indices()
+        if all(cells[cell] < cells[cell + offset] for offset in offsets)
+    ]
 
 
 def test_find_lowpoint_coordinates() -> None:
@@ -191,36 +241,113 @@ def test_find_lowpoint_coordinates() -> None:
 Basin = list[Point]
 
 
-def solve_part_two(grid: Grid) -> int:
+def solve_part_two(grid: Heights) -> int:
     """Return the product of the three largest basins."""
-    minimas = find_lowpoint_coordinates(grid)
-    basins = [find_basin(grid, minima) for minima in minimas]
-    sizes = [len(basin) for basin in basins]
-    return math.prod(sorted(sizes)[-3:])
+    return math.prod(largest_basins(grid, 3))
 
 
 def test_solve_part_two() -> None:
     expected = 1134
     actual = solve_part_two(TEST_GRID)
     assert actual == expected
+    assert solve_part_two(DigitGrid.from_rows(TEST_GRID)) == expected
+
+
+Parents = Union[list[int], dict[int, int]]
+
+
+def find_root(parents: Parents, cell: int) -> int:
+    """Return the representative of the cell's set, halving the path on the way."""
+    while parents[cell] != cell:
+        parents[cell] = parents[parents[cell]]
+        cell = parents[cell]
+    return cell
+
+
+def union(parents: Parents, first: int, second: int) -> None:
+    """Merge the sets containing the two cells."""
+    first, second = find_root(parents, first), find_root(parents, second)
+    if first != second:
+        parents[max(first, second)] = min(first, second)
+
+
+def merge(parents: Parents, sizes: dict[int, int], first: int, second: int) -> None:
+    """Merge the sets containing the two cells, keeping the size of each root."""
+    first, second = find_root(parents, first), find_root(parents, second)
+    if first != second:
+        root, child = min(first, second), max(first, second)
+        parents[child] = root
+        sizes[root] += sizes.pop(child)
+
+
+def label_cells(heights: Sequence[int], width: int) -> list[int]:
+    """Return the representative cell of each cell's basin, or -1 for a 9 or higher.
+
+    Since every location other than a 9 belongs to exactly one basin, the
+    basins are the connected components of the non-9 cells. A single raster
+    scan unions each cell with its left and upper neighbours over a flat
+    array of cell indices, so no lowpoint search or flood fill is needed.
+    The representative is the first cell of the basin in scan order. Cells
+    higher than 9, such as the border of a DigitGrid, are walls like a 9.
+    """
+    parents = list(range(len(heights)))
+    for cell, height in enumerate(heights):
+        if height >= 9:
+            continue
+        if cell % width and heights[cell - 1] < 9:
+            union(parents, cell - 1, cell)
+        if cell >= width and heights[cell - width] < 9:
+            union(parents, cell - width, cell)
+    return [
+        -1 if height >= 9 else find_root(parents, cell)
+        for cell, height in enumerate(heights)
+    ]
+
 
+def label_basins(grid: Heights) -> list[int]:
+    """Return the sizes of all basins, in the order their first cell is scanned."""
+    heights = DigitGrid.of(grid)
+    sizes: dict[int, int] = {}
+    for label in label_cells(heights.cells, heights.stride):
+        if label != -1:
+            sizes[label] = sizes.get(label, 0) + 1
+    return list(sizes.values())
 
-def find_basin(grid: Grid, lowpoint: Point) -> Basin:
-    """Return the basin that contains the lowpoint."""
-    basin: set[Point] = set()
-    candidates: list[Point] = [lowpoint]
+
+def test_label_basins() -> None:
+    assert label_basins(TEST_GRID) == [3, 9, 14, 9]
+    assert label_basins([[9, 9], [9, 9]]) == []
+    assert label_basins([]) == []
+
+
+def largest_basins(grid: Heights, count: int) -> list[int]:
+    """Return the sizes of the count largest basins, largest first."""
+    return heapq.nlargest(count, label_basins(grid))
+
+
+def test_largest_basins() -> None:
+    assert largest_basins(TEST_GRID, 3) == [14, 9, 9]
+    assert largest_basins(TEST_GRID, 10) == [14, 9, 9, 3]
+
+
+def find_basin(grid: Heights, lowpoint: Point) -> Basin:
+    """Return the basin that contains the lowpoint.
+
+    Pass a DigitGrid when finding many basins of the same grid, so that it
+    is only built once.
+    """
+    heights = DigitGrid.of(grid)
+    offsets = heights.orthogonal_offsets
+    start = heights.index(lowpoint.x, lowpoint.y)
+    basin = {start}
+    candidates = deque([start])
     while candidates:
-        # TODO: replace with deque
-        candidate = candidates.pop(0)
-        basin.add(candidate)
-        candidates.extend(
-            [
-                neighbor
-                for neighbor in find_neighbor_coordinates(grid, candidate)
-                if neighbor.value != 9 and neighbor not in basin
-            ]
-        )
-    return list(basin)
+        cell = candidates.popleft()
+        for neighbor in (cell + offset for offset in offsets):
+            if heights[neighbor] < 9 and neighbor not in basin:
+                basin.add(neighbor)
+                candidates.append(neighbor)
+    return [Point(*heights.coordinates(cell), value=heights[cell]) for cell in basin]
 
 
 @pytest.mark.parametrize(
@@ -247,34 +374,210 @@ def find_basin(grid: Grid, lowpoint: Point) -> Basin:
 def test_find_basin(grid: Grid, lowpoint: Point, expected: Basin) -> None:
     actual = find_basin(grid, lowpoint)
     assert sorted(actual) == sorted(expected)
+    assert sorted(find_basin(DigitGrid.from_rows(grid), lowpoint)) == sorted(expected)
 
 
 def find_neighbor_coordinates(grid: Grid, point: Point) -> list[Point]:
     """Return the coordinates of the cardinally adjacent neighbors to the element at the given point."""
-    max_y = len(grid) - 1
-    max_x = len(grid[0]) - 1
-    up = (point.x, point.y - 1)
-    down = (point.x, point.y + 1)
-    left = (point.x - 1, point.y)
-    right = (point.x + 1, point.y)
     return [
         Point(x, y, value=grid[y][x])
-        for (x, y) in (up, down, left, right)
-        if 0 <= x <= max_x and 0 <= y <= max_y
+        for x, y in ((point.x + dx, point.y + dy) for dx, dy in ORTHOGONAL)
+        if 0 <= x < len(grid[0]) and 0 <= y < len(grid)
     ]
 
 
+class TiledHeightmap:
+    """Represent a heightmap file that is processed one tile at a time.
+
+    The file is memory-mapped rather than read, and only the heights of the
+    current tile are held as integers, so memory is bounded by the tile size
+    rather than the size of the map. Rows must all have the same length.
+    """
+
+    def __init__(self, path: Path, tile_size: int = 1024) -> None:
+        self.tile_size = tile_size
+        self._file = path.open("rb")
+        self._map: Optional[mmap.mmap] = None
+        self.rows = self.columns = 0
+        if path.stat().st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            end = self._map.find(b"\n")
+            end = len(self._map) if end == -1 else end
+            self._stride = end + 1
+            self.columns = end - 1 if self._map[end - 1 : end] == b"\r" else end
+            size = len(self._map)
+            while size and self._map[size - 1 : size].isspace():
+                size -= 1
+            self.rows = (size - self.columns) // self._stride + 1 if size else 0
+
+    def read(self, top: int, left: int, bottom: int, right: int) -> list[int]:
+        """Return the heights of the rectangle as a flat list, row by row.
+
+        Locations outside the map read as BORDER, like the border of a DigitGrid.
+        """
+        width = right - left
+        start, stop = max(left, 0), min(right, self.columns)
+        before, after = [BORDER] * (start - left), [BORDER] * (right - stop)
+        heights: list[int] = []
+        for y in range(top, bottom):
+            if not 0 <= y < self.rows or start >= stop:
+                heights.extend([BORDER] * width)
+                continue
+            offset = y * self._stride
+            heights.extend(before)
+            heights.extend(self._map[offset + start : offset + stop].translate(DIGITS))
+            heights.extend(after)
+        return heights
+
+    def tiles(self) -> list[tuple[int, int, int, int]]:
+        """Return the top, left, bottom and right of each tile, in scan order."""
+        size = self.tile_size
+        return [
+            (top, left, min(top + size, self.rows), min(left + size, self.columns))
+            for top in range(0, self.rows, self.tile_size)
+            for left in range(0, self.columns, self.tile_size)
+        ]
+
+    def risk_level_sum(self) -> int:
+        """Return the sum of the risk levels of all low points.
+
+        Each tile is read with a one-cell halo so that the locations on its
+        border can be compared with their neighbours in the adjacent tiles.
+        """
+        total = 0
+        for top, left, bottom, right in self.tiles():
+            heights = self.read(top - 1, left - 1, bottom + 1, right + 1)
+            stride = right - left + 2
+            for y in range(1, bottom - top + 1):
+                for cell in range(y * stride + 1, y * stride + stride - 1):
+                    height = heights[cell]
+                    if (
+                        height < heights[cell - stride]
+                        and height < heights[cell + stride]
+                        and height < heights[cell - 1]
+                        and height < heights[cell + 1]
+                    ):
+                        total += height + 1
+        return total
+
+    def basin_sizes(self) -> Iterator[int]:
+        """Yield the size of each basin once it is complete.
+
+        Basins are labelled within each tile, then merged with a union-find
+        over the tile labels wherever two non-9 locations face each other
+        across a tile border. Only the labels along the bottom of the
+        previous row of tiles and the right of the previous tile can still
+        grow, so the union-find is regularly cut back to those labels and
+        every other basin is yielded. Memory is bounded by the width of the
+        map and the tile size, not the number of basins.
+        """
+        parents: Parents = {}
+        sizes: dict[int, int] = {}  # The size of the basin of each root.
+        limit = 2 * (self.columns + self.tile_size)
+        above = [-1] * self.columns
+        next_label = 0
+        for top, left, bottom, right in self.tiles():
+            width = right - left
+            if left == 0:
+                beside: list[int] = []
+                below = [-1] * self.columns
+            labels: dict[int, int] = {}
+            tile = []
+            for label in label_cells(self.read(top, left, bottom, right), width):
+                if label != -1:
+                    if label not in labels:
+                        labels[label] = parents[next_label] = next_label
+                        sizes[next_label] = 0
+                        next_label += 1
+                    label = labels[label]
+                    sizes[label] += 1
+                tile.append(label)
+            for x, label in enumerate(tile[:width]):
+                if label != -1 and above[left + x] != -1:
+                    merge(parents, sizes, above[left + x], label)
+            for y, label in enumerate(beside):
+                if label != -1 and tile[y * width] != -1:
+                    merge(parents, sizes, label, tile[y * width])
+            beside = tile[width - 1 :: width]
+            below[left:right] = tile[-width:]
+            if right == self.columns:
+                above = below
+            if len(parents) > limit:
+                # Point the labels that can still grow at their roots, so
+                # every other label can be dropped.
+                edges = [above, beside] if above is below else [above, below, beside]
+                for edge in edges:
+                    edge[:] = [
+                        -1 if label == -1 else find_root(parents, label)
+                        for label in edge
+                    ]
+                live = set(above[right:] + below[:right] + beside)
+                for root in [root for root in sizes if root not in live]:
+                    yield sizes.pop(root)
+                parents = {root: root for root in sizes}
+        yield from sizes.values()
+
+    def largest_basins(self, count: int) -> list[int]:
+        """Return the sizes of the count largest basins, largest first."""
+        return heapq.nlargest(count, self.basin_sizes())
+
+    def close(self) -> None:
+        """Release the mapping of the file."""
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def test_tiled_heightmap(tmp_path: Path) -> None:
+    path = tmp_path / "heightmap.txt"
+    path.write_text("\n".join(TEST_HEIGHTMAP) + "\n")
+    for tile_size in (1, 3, 4, 100):
+        heightmap = TiledHeightmap(path, tile_size=tile_size)
+        assert (heightmap.rows, heightmap.columns) == (5, 10)
+        assert heightmap.risk_level_sum() == 15
+        assert sorted(heightmap.basin_sizes()) == [3, 9, 9, 14]
+        assert heightmap.largest_basins(3) == [14, 9, 9]
+        heightmap.close()
+    assert TiledHeightmap(path).read(-1, 8, 1, 11) == [BORDER] * 3 + [1, 0, BORDER]
+    for ending in ("\r\n", "\r\n\r\n", ""):
+        path.write_bytes("\r\n".join(TEST_HEIGHTMAP).encode() + ending.encode())
+        heightmap = TiledHeightmap(path, tile_size=3)
+        assert (heightmap.rows, heightmap.columns) == (5, 10)
+        assert heightmap.risk_level_sum() == 15
+        assert sorted(heightmap.basin_sizes()) == [3, 9, 9, 14]
+        heightmap.close()
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    heightmap = TiledHeightmap(empty)
+    assert heightmap.risk_level_sum() == 0
+    assert list(heightmap.basin_sizes()) == []
+    heightmap.close()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tiled_heightmap_matches_grid(tmp_path: Path, seed: int) -> None:
+    rng = random.Random(seed)
+    grid = [[rng.choice([1, 2, 3, 9, 9]) for _ in range(23)] for _ in range(19)]
+    path = tmp_path / "heightmap.txt"
+    path.write_text("\n".join("".join(map(str, row)) for row in grid))
+    heightmap = TiledHeightmap(path, tile_size=4)
+    assert heightmap.risk_level_sum() == solve_part_one(grid)
+    assert sorted(heightmap.basin_sizes()) == sorted(label_basins(grid))
+    heightmap.close()
+    # Enough small basins that finished ones are yielded along the way.
+    grid = [[rng.choice([1, 9]) for _ in range(61)] for _ in range(47)]
+    path.write_text("\n".join("".join(map(str, row)) for row in grid))
+    heightmap = TiledHeightmap(path, tile_size=3)
+    assert sorted(heightmap.basin_sizes()) == sorted(label_basins(grid))
+    assert heightmap.largest_basins(3) == largest_basins(grid, 3)
+    heightmap.close()
+
+
 if __name__ == "__main__":
     from pathlib import Path
 
     input_file = Path("./input09.txt")
-    with input_file.open() as f:
-        heightmap = [
-            line.strip().strip("\n")
-            for line in f.readlines()
-            if line.strip().strip("\n")
-        ]
-        grid = convert_heightmap_to_grid(heightmap)
+    grid = DigitGrid.load(input_file)
     print(
         "Find all of the low points on your heightmap. What is the sum of the risk levels of all low points on your heightmap?",
         solve_part_one(grid),
@@ -299,91 +299,57 @@ After 100 steps, there have been a total of 1656 flashes.
 
 Given the starting energy levels of the dumbo octopuses in your cavern, simulate 100 steps. How many total flashes are there after 100 steps?
 """
-from dataclasses import dataclass
+from typing import Union
 
 import pytest
 
+from grid import BORDER, DigitGrid
+
 Grid = list[list[int]]
-Point = tuple[int, int]
-OctopusMap = dict[Point, "Octopus"]
-
-
-@dataclass
-class Octopus:
-    x: int
-    y: int
-    energy: int
-    octopuses: OctopusMap
-
-    @property
-    def neighbors(self) -> list["Octopus"]:
-        positions = [
-            (0, 1),  # down
-            (0, -1),  # up
-            (-1, 0),  # left
-            (1, 0),  # right
-            (1, -1),  # upper right
-            (1, 1),  # lower right
-            (-1, -1),  # upper left
-            (-1, 1),  # lower left
-        ]
-        return [
-            self.octopuses[self.x + x, self.y + y]
-            for (x, y) in positions
-            if (self.x + x, self.y + y) in self.octopuses
-        ]
-
-    def __hash__(self):
-        return hash((self.x, self.y))
-
-
-def map_octopuses(grid: Grid) -> OctopusMap:
-    """Return a map of coordinates to Octopus."""
-    octopuses: OctopusMap = {}
-    for row_idx, row in enumerate(grid):
-        for column_idx, energy in enumerate(row):
-            octopuses[(column_idx, row_idx)] = Octopus(
-                column_idx, row_idx, energy, octopuses
-            )
-    return octopuses
-
-
-def solve_part_one(grid: Grid, steps: int = 100) -> int:
+Energies = Union[Grid, DigitGrid]
+
+# Energy levels after gaining 1, and after every octopus that flashed is reset.
+# The border around the grid keeps its value.
+INCREMENT = bytes(min(energy + 1, BORDER) for energy in range(BORDER)) + bytes([BORDER])
+RESET = bytes(0 if 9 < energy < BORDER else energy for energy in range(256))
+
+
+def solve_part_one(grid: Energies, steps: int = 100) -> int:
     """Return the number of flashes that occur after the given number of steps."""
-    octopuses = map_octopuses(grid)
+    octopuses = DigitGrid.of(grid).copy()
     total_flashes = 0
     for _ in range(steps):
-        octopuses, flashes_this_step = step(octopuses)
-        total_flashes += flashes_this_step
+        total_flashes += step(octopuses)
     return total_flashes
 
 
-def step(octopuses: OctopusMap) -> tuple[OctopusMap, int]:
-    """Return the octopuses after advancing one step and the count of flashes this step."""
+def step(octopuses: DigitGrid) -> int:
+    """Advance the energy levels of the octopuses one step and return the count of flashes."""
     # First, the energy level of each octopus increases by 1.
-    for octopus in octopuses.values():
-        octopus.energy += 1
+    energies = octopuses.cells
+    energies[:] = energies.translate(INCREMENT)
     # Then, any octopus with an energy level greater than 9 flashes.
-    to_flash = set(octopus for octopus in octopuses.values() if octopus.energy > 9)
+    to_flash = [index for index, energy in enumerate(energies) if 9 < energy < BORDER]
     # This increases the energy level of all adjacent octopuses by 1,
     # including octopuses that are diagonally adjacent. If this causes
     # an octopus to have an energy level greater than 9, it also flashes.
     # This process continues as long as new octopuses keep having their
     # energy level increased beyond 9. (An octopus can only flash
-    # at most once per step.)
-    has_flashed: set[Octopus] = set()
+    # at most once per step.) Only energy levels up to 9 are increased, so
+    # an octopus that has flashed and the border are left alone.
+    offsets = octopuses.all_offsets
+    flashes = 0
     while to_flash:
-        current = to_flash.pop()
-        has_flashed.add(current)
-        for neighbor in current.neighbors:
-            if neighbor in has_flashed:
-                continue
-            neighbor.energy += 1
-            if neighbor.energy > 9:
-                to_flash.add(neighbor)
-    for octo in has_flashed:
-        octo.energy = 0
-    return octopuses, len(has_flashed)
+        flashes += 1
+        octopus = to_flash.pop()
+        for offset in offsets:
+            neighbor = octopus + offset
+            if energies[neighbor] <= 9:
+                energies[neighbor] += 1
+                if energies[neighbor] > 9:
+                    to_flash.append(neighbor)
+    energies[:] = energies.translate(RESET)
+    return flashes
 
 
 TEST_GRID = [
@@ -462,14 +428,14 @@ If you can calculate the exact moments when the octopuses will all flash simulta
 """
 
 
-def solve_part_two(grid: Grid) -> int:
+def solve_part_two(grid: Energies) -> int:
     """Return the number of the first step during which all octopuses flash."""
-    octopuses = map_octopuses(grid)
+    octopuses = DigitGrid.of(grid).copy()
     step_count = 0
     while True:
-        if not sum(octopus.energy for octopus in octopuses.values()):
+        if octopuses.cells.count(0) == len(octopuses):
             return step_count
-        octopuses, _ = step(octopuses)
+        step(octopuses)
         step_count += 1
 
 
@@ -477,17 +443,17 @@ def test_solve_part_two() -> None:
     expected = 195
     actual = solve_part_two(TEST_GRID)
     assert actual == expected
+    octopuses = DigitGrid.from_rows(TEST_GRID)
+    assert solve_part_one(octopuses, steps=10) == 204
+    assert solve_part_two(octopuses) == expected
+    assert octopuses.to_lists() == TEST_GRID
 
 
 if __name__ == "__main__":
     from pathlib import Path
 
     input_file = Path("./input11.txt")
-    with input_file.open() as f:
-        grid: Grid = [
-            [int(octopus) for octopus in row.strip().strip().strip("\n")]
-            for row in f.readlines()
-        ]
+    grid = DigitGrid.load(input_file)
     print(
         "Given the starting energy levels of the dumbo octopuses in your cavern, simulate 100 steps. How many total flashes are there after 100 steps?",
         solve_part_one(grid),
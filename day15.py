@@ -36,10 +36,12 @@ The total risk of this path is 40 (the starting position is never entered, so it
 What is the lowest total risk of any path from the top left to the bottom right?
 """
 
-from queue import PriorityQueue
-from typing import NamedTuple
+from typing import Union
+import heapq
 import sys
 
+from grid import BORDER, DigitGrid
+
 TEST_RISK_MAP = [
     [1, 1, 6, 3, 7, 5, 1, 7, 4, 2],
     [1, 3, 8, 1, 3, 7, 3, 6, 7, 2],
@@ -54,48 +56,35 @@ TEST_RISK_MAP = [
 ]
 
 Grid = list[list[int]]
+Risks = Union[Grid, DigitGrid]
 
 
-class Node(NamedTuple):
-    x: int
-    y: int
-    risk: int
-
-
-def solve_part_one(risk_map: Grid) -> int:
+def solve_part_one(risk_map: Risks) -> int:
     """Return the lowest total risk of any path from the top left to the bottom right."""
-    nodes = [
-        Node(x, y, risk)
-        for (y, row) in enumerate(risk_map)
-        for (x, risk) in enumerate(row)
-    ]
-    node_map = {(node.x, node.y): node for node in nodes}
-    start = nodes[0]
-    end = nodes[-1]
-    risks = {node: sys.maxsize for node in nodes}
-    risks[start] = 0
-    queue: PriorityQueue[tuple[int, Node]] = PriorityQueue()
-    queue.put((risks[start], start))
-    while not queue.empty():
-        risk, node = queue.get()
+    risks = DigitGrid.of(risk_map)
+    offsets = risks.orthogonal_offsets
+    start = risks.index(0, 0)
+    end = risks.index(risks.width - 1, risks.height - 1)
+    totals = [sys.maxsize] * len(risks.cells)
+    totals[start] = 0
+    queue = [(totals[start], start)]
+    while queue:
+        risk, node = heapq.heappop(queue)
         if node == end:
             return risk
-        up = (0, -1)
-        down = (0, 1)
-        left = (-1, 0)
-        right = (1, 0)
-        neighbors = [
-            node_map[(node.x + x, node.y + y)]
-            for x, y in [up, down, left, right]
-            if (node.x + x, node.y + y) in node_map
-        ]
-        for neighbor in neighbors:
-            current_distance = risks[neighbor]
-            risk_through_node = risk + neighbor.risk
-            if risk_through_node < current_distance:
-                risks[neighbor] = risk_through_node
-                queue.put((risk_through_node, neighbor))
-    raise Exception(f"No path from start, {start}, to end, {end}, could be found.")
+        if risk > totals[node]:
+            continue
+        for neighbor in (node + offset for offset in offsets):
+            if risks[neighbor] == BORDER:
+                continue
+            risk_through_node = risk + risks[neighbor]
+            if risk_through_node < totals[neighbor]:
+                totals[neighbor] = risk_through_node
+                heapq.heappush(queue, (risk_through_node, neighbor))
+    raise Exception(
+        f"No path from start, {risks.coordinates(start)}, "
+        f"to end, {risks.coordinates(end)}, could be found."
+    )
 
 
 def test_solve_part_one() -> None:
@@ -231,28 +220,33 @@ Using the full map, what is the lowest total risk of any path from the top left
 """
 
 
-def solve_part_two(risk_map: Grid) -> int:
+def solve_part_two(risk_map: Risks) -> int:
     """Return the lowest risk total of any path from the top left to the bottom right using the full map."""
-    risk_map = extend_map(risk_map)
-    return solve_part_one(risk_map)
+    return solve_part_one(extend_grid(risk_map))
 
 
-def extend_map(risk_map: Grid) -> Grid:
-    """Return an extended risk map based on the original."""
-    extended: Grid = [
-        [0 for _ in range(len(risk_map[0]) * 5)] for __ in range(len(risk_map) * 5)
+def extend_grid(risk_map: Risks, times: int = 5) -> DigitGrid:
+    """Return the risk map repeated times by times, with risks rising in each copy."""
+    tile = DigitGrid.of(risk_map)
+    shifts = [shift_risks(shift) for shift in range(2 * times - 1)]
+    rows = [
+        b"".join(bytes(row).translate(shifts[i + j]) for i in range(times))
+        for j in range(times)
+        for row in tile.rows()
     ]
+    return DigitGrid.from_rows(rows)
+
 
-    for y, row in enumerate(risk_map):
-        for x, risk in enumerate(row):
-            for j in range(5):
-                for i in range(5):
-                    new_risk = risk + i + j
-                    if new_risk > 9:
-                        new_risk = new_risk - 9
-                    extended[y + j * len(risk_map)][x + i * (len(row))] = new_risk
+def shift_risks(shift: int) -> bytes:
+    """Return a translation table adding shift to each risk, wrapping around after 9."""
+    return bytes(
+        (risk + shift - 1) % 9 + 1 if 1 <= risk <= 9 else risk for risk in range(256)
+    )
 
-    return extended
+
+def extend_map(risk_map: Risks) -> Grid:
+    """Return an extended risk map based on the original."""
+    return extend_grid(risk_map).to_lists()
 
 
 def test_extend_map() -> None:
@@ -2866,18 +2860,14 @@ def test_solve_part_two() -> None:
     expected = 315
     actual = solve_part_two(TEST_RISK_MAP)
     assert actual == expected
+    assert solve_part_two(DigitGrid.from_rows(TEST_RISK_MAP)) == expected
 
 
 if __name__ == "__main__":
     from pathlib import Path
 
     input_file = Path("./input15.txt")
-    with input_file.open() as f:
-        risk_map = [
-            [int(space) for space in line.strip().strip("\n")]
-            for line in f.readlines()
-            if line.strip().strip("\n")
-        ]
+    risk_map = DigitGrid.load(input_file)
     print(
         "What is the lowest total risk of any path from the top left to the bottom right?",
         solve_part_one(risk_map),
@@ -0,0 +1,164 @@
+"""
+A compact grid of digits shared by the puzzles that work on a map of heights,
+energy levels or risks (days 9, 11 and 15).
+
+The cells are kept row by row in a flat bytearray surrounded by a one-cell
+border, so a location is a single index rather than a pair of coordinates, and
+its neighbours are found by adding the same fixed offsets to that index
+everywhere instead of bounds checking on every step.
+"""
+
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+import pytest
+
+DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+# The value of the cells around the grid; higher than any digit.
+BORDER = 255
+
+ORTHOGONAL = ((0, -1), (0, 1), (-1, 0), (1, 0))  # up, down, left, right
+DIAGONAL = ((1, -1), (1, 1), (-1, -1), (-1, 1))
+
+
+class DigitGrid:
+    """Represent a rectangular grid of small integers stored in a flat bytearray.
+
+    The cells include a border of BORDER all around the grid, so each row
+    takes stride = width + 2 cells and the cell at column x of row y is at
+    index (y + 1) * stride + x + 1. Use the classmethods to build a grid.
+    """
+
+    def __init__(self, cells: bytearray, width: int, height: int) -> None:
+        self.cells = cells
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        stride = self.stride
+        self.orthogonal_offsets = tuple(dy * stride + dx for dx, dy in ORTHOGONAL)
+        self.all_offsets = self.orthogonal_offsets + tuple(
+            dy * stride + dx for dx, dy in DIAGONAL
+        )
+
+    @classmethod
+    def of(cls, grid: Union["DigitGrid", Iterable[Iterable[int]]]) -> "DigitGrid":
+        """Return the grid itself if it is a DigitGrid, else a grid of its rows."""
+        return grid if isinstance(grid, DigitGrid) else cls.from_rows(grid)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable[int]]) -> "DigitGrid":
+        """Return a grid of the rows of integers, such as a list of lists."""
+        return cls._from_padded([bytes(row) for row in rows])
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "DigitGrid":
+        """Return a grid of the lines of digits, skipping blank lines."""
+        rows = [line.strip().encode() for line in lines if line.strip()]
+        return cls._from_padded(rows, DIGITS)
+
+    @classmethod
+    def load(cls, path: Path) -> "DigitGrid":
+        """Return a grid of the lines of digits in the file."""
+        return cls._from_padded(path.read_bytes().split(), DIGITS)
+
+    @classmethod
+    def _from_padded(
+        cls, rows: list[bytes], table: Optional[bytes] = None
+    ) -> "DigitGrid":
+        width = len(rows[0]) if rows else 0
+        if any(len(row) != width for row in rows):
+            raise ValueError(f"Every row must have {width} cells.")
+        border = bytes([BORDER])
+        edge = border * (width + 2)
+        cells = bytearray(
+            edge + border + (border * 2).join(rows) + border + edge if rows else b""
+        )
+        if table is not None:
+            cells = cells.translate(table)
+        return cls(cells, width, len(rows))
+
+    def copy(self) -> "DigitGrid":
+        """Return a grid with a copy of the cells."""
+        return DigitGrid(self.cells.copy(), self.width, self.height)
+
+    def __len__(self) -> int:
+        """Return the number of cells in the grid, not counting the border."""
+        return self.width * self.height
+
+    def __getitem__(self, index: int) -> int:
+        return self.cells[index]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        self.cells[index] = value
+
+    def index(self, x: int, y: int) -> int:
+        """Return the index of the cell at the coordinates."""
+        return (y + 1) * self.stride + x + 1
+
+    def coordinates(self, index: int) -> tuple[int, int]:
+        """Return the x and y coordinates of the cell at the index."""
+        y, x = divmod(index, self.stride)
+        return x - 1, y - 1
+
+    def indices(self) -> Iterator[int]:
+        """Yield the index of each cell inside the border, row by row."""
+        for y in range(self.height):
+            start = self.index(0, y)
+            yield from range(start, start + self.width)
+
+    def row(self, y: int) -> memoryview:
+        """Return a view of the row that shares the grid's memory."""
+        start = self.index(0, y)
+        return memoryview(self.cells)[start : start + self.width]
+
+    def rows(self) -> Iterator[memoryview]:
+        """Yield a view of each row, from top to bottom."""
+        for y in range(self.height):
+            yield self.row(y)
+
+    def to_lists(self) -> list[list[int]]:
+        """Return the grid as a list of lists of integers."""
+        return [list(row) for row in self.rows()]
+
+
+TEST_LINES = ["2199943210", "3987894921", "9856789892"]
+
+
+def test_digit_grid(tmp_path: Path) -> None:
+    grid = DigitGrid.from_lines(TEST_LINES + [""])
+    assert (grid.width, grid.height, len(grid)) == (10, 3, 30)
+    assert len(grid.cells) == 12 * 5
+    assert grid.to_lists()[1] == [3, 9, 8, 7, 8, 9, 4, 9, 2, 1]
+    assert grid[grid.index(2, 2)] == 5
+    assert grid.coordinates(grid.index(5, 2)) == (5, 2)
+    assert len(list(grid.indices())) == len(grid)
+    top = grid.index(1, 0)
+    around = [grid[top + offset] for offset in grid.orthogonal_offsets]
+    assert around == [BORDER, 9, 2, 9]
+    middle = grid.index(1, 1)
+    around = [grid[middle + offset] for offset in grid.all_offsets]
+    assert around == [1, 8, 3, 8, 9, 5, 2, 9]
+    path = tmp_path / "grid.txt"
+    path.write_text("\r\n".join(TEST_LINES) + "\r\n")
+    assert DigitGrid.load(path).cells == grid.cells
+    assert DigitGrid.from_rows(grid.to_lists()).cells == grid.cells
+    assert DigitGrid.of(grid) is grid
+    copy = grid.copy()
+    copy[copy.index(0, 0)] = 0
+    assert copy.cells != grid.cells and copy.to_lists()[1:] == grid.to_lists()[1:]
+    assert DigitGrid.from_lines([]).to_lists() == []
+
+
+def test_row_views_share_memory() -> None:
+    grid = DigitGrid.from_lines(TEST_LINES)
+    row = grid.row(1)
+    row[0] = 7
+    assert grid[grid.index(0, 1)] == 7
+    grid[grid.index(9, 1)] = 0
+    assert row[-1] == 0
+
+
+def test_digit_grid_rejects_ragged_rows() -> None:
+    with pytest.raises(ValueError):
+        DigitGrid.from_rows([[1, 2], [3]])